@@ -8,6 +8,254 @@ from playwright.async_api import async_playwright, Page, BrowserContext, Element
 from config import config
 from datetime import datetime, timedelta
 
+# orjson (опционально) - быстрая сериализация отчетов
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dump_report(report: Dict) -> bytes:
+    """Сериализовать отчет в JSON (orjson, если доступен)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(report, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+    """Записать байты в файл"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+# Таблицы для str.translate (одна операция вместо цепочки replace)
+_NO_SPACE = str.maketrans('', '', ' \t\n')
+_CLASS_DOTS = str.maketrans(' -', '..')
+
+
+# Исходники JS-функций передаются в evaluate при каждом вызове: глобальные
+# хелперы на странице сайт мог бы обнаружить, подменить или удалить
+
+# Интерактивные элементы страницы (для get_page_summary)
+_JS_INTERACTIVE_ELEMENTS = """
+() => {
+    const elements = [];
+    const selectors = [
+        'a', 'button', 'input[type="button"]', 'input[type="submit"]',
+        '[role="button"]', '[role="link"]', '[role="tab"]',
+        'input[type="text"]', 'input[type="email"]', 
+        'input[type="password"]', 'input[type="search"]',
+        'textarea', 'select', '[contenteditable="true"]',
+        'input:not([type])', 'div[onclick]', 'span[onclick]',
+        '[data-testid]', '[data-qa]', '[data-test]',
+        '[role="menuitem"]', '[role="option"]', '[role="radio"]',
+        '[role="checkbox"]', '[type="radio"]', '[type="checkbox"]'
+    ];
+
+    // Собираем видимые элементы
+    selectors.forEach(selector => {
+        const nodeList = document.querySelectorAll(selector);
+        for (const el of nodeList) {
+            const rect = el.getBoundingClientRect();
+            const style = window.getComputedStyle(el);
+
+            // Проверяем видимость
+            if (rect.width > 0 && rect.height > 0 &&
+                style.display !== 'none' &&
+                style.visibility !== 'hidden' &&
+                style.opacity !== '0') {
+
+                // Получаем текст элемента
+                let text = '';
+                if (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' || el.tagName === 'SELECT') {
+                    text = el.placeholder || el.value || el.name || el.id || el.getAttribute('aria-label') || '';
+                } else {
+                    text = el.innerText?.trim() || 
+                           el.textContent?.trim() || 
+                           el.getAttribute('aria-label') || 
+                           el.title || 
+                           el.alt || 
+                           el.getAttribute('data-text') || '';
+                }
+
+                // Фильтруем пустые или слишком длинные тексты
+                if (text && text.length > 0 && text.length < 100) {
+                    const isInput = el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' || el.tagName === 'SELECT';
+                    const isButton = el.tagName === 'BUTTON' || 
+                                    el.getAttribute('role') === 'button' ||
+                                    (el.tagName === 'INPUT' && 
+                                     (el.type === 'button' || el.type === 'submit')) ||
+                                    el.hasAttribute('onclick');
+                    const isLink = el.tagName === 'A' || el.getAttribute('role') === 'link';
+                    const isCheckbox = el.type === 'checkbox' || el.getAttribute('role') === 'checkbox';
+                    const isRadio = el.type === 'radio' || el.getAttribute('role') === 'radio';
+
+                    elements.push({
+                        "text": text.replace(/\\n/g, ' ').substring(0, 80),
+                        "tag": el.tagName.toLowerCase(),
+                        "type": el.type || '',
+                        "is_input": isInput,
+                        "is_button": isButton,
+                        "is_link": isLink,
+                        "is_checkbox": isCheckbox,
+                        "is_radio": isRadio,
+                        "id": el.id || '',
+                        "class": el.className.substring(0, 30) || '',
+                        "visible": true,
+                        "coordinates": {
+                            "x": Math.round(rect.x),
+                            "y": Math.round(rect.y),
+                            "width": Math.round(rect.width),
+                            "height": Math.round(rect.height)
+                        }
+                    });
+                }
+            }
+        }
+    });
+
+    // Удаляем дубликаты по тексту и координатам
+    const uniqueElements = [];
+    const seenKeys = new Set();
+
+    for (const elem of elements) {
+        const key = `${elem.text.toLowerCase().trim()}_${elem.coordinates.x}_${elem.coordinates.y}`;
+        if (key && !seenKeys.has(key) && elem.text.length > 1) {
+            seenKeys.add(key);
+            uniqueElements.push(elem);
+        }
+    }
+
+    // Сортируем по позиции на странице (сверху вниз, слева направо)
+    uniqueElements.sort((a, b) => {
+        if (a.coordinates.y !== b.coordinates.y) {
+            return a.coordinates.y - b.coordinates.y;
+        }
+        return a.coordinates.x - b.coordinates.x;
+    });
+
+    return uniqueElements.slice(0, 50); // Ограничиваем количество
+}
+"""
+
+# Видимый текст страницы (для get_full_page_text)
+_JS_PAGE_TEXT = """
+() => {
+    // Функция для извлечения видимого текста
+    function extractVisibleText(node) {
+        let text = '';
+
+        // Рекурсивно обходим дерево
+        const walker = document.createTreeWalker(
+            node,
+            NodeFilter.SHOW_TEXT,
+            {
+                acceptNode: function(node) {
+                    // Пропускаем скрытые элементы
+                    const parent = node.parentElement;
+                    if (!parent) return NodeFilter.FILTER_REJECT;
+
+                    const style = window.getComputedStyle(parent);
+                    if (parent.offsetParent === null ||
+                        style.display === 'none' ||
+                        style.visibility === 'hidden' ||
+                        style.opacity === '0' ||
+                        parent.hidden ||
+                        parent.closest('[hidden]')) {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+
+                    // Пропускаем пустой текст
+                    const nodeText = node.textContent.trim();
+                    if (nodeText.length === 0) {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+
+                    // Пропускаем скрипты и стили
+                    if (parent.tagName === 'SCRIPT' || 
+                        parent.tagName === 'STYLE' ||
+                        parent.tagName === 'NOSCRIPT' ||
+                        parent.tagName === 'SVG' ||
+                        parent.tagName === 'PATH') {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+
+                    // Пропускаем слишком маленькие элементы (иконки и т.д.)
+                    const rect = parent.getBoundingClientRect();
+                    if (rect.width < 5 && rect.height < 5) {
+                        return NodeFilter.FILTER_REJECT;
+                    }
+
+                    return NodeFilter.FILTER_ACCEPT;
+                }
+            }
+        );
+
+        let currentNode;
+        while (currentNode = walker.nextNode()) {
+            text += currentNode.textContent.trim() + ' ';
+        }
+
+        return text.replace(/\\s+/g, ' ').trim();
+    }
+
+    return extractVisibleText(document.body);
+}
+"""
+
+# Перекрыт ли элемент другим элементом
+_JS_IS_COVERED = """
+element => {
+    const rect = element.getBoundingClientRect();
+    const centerX = rect.left + rect.width / 2;
+    const centerY = rect.top + rect.height / 2;
+    const topElement = document.elementFromPoint(centerX, centerY);
+    return topElement !== element && !element.contains(topElement);
+}
+"""
+
+# Неактивен ли элемент
+_JS_IS_DISABLED = """
+element => {
+    return element.disabled || element.getAttribute('aria-disabled') === 'true';
+}
+"""
+
+# Подсветить элемент, вернуть оригинальный стиль
+_JS_HIGHLIGHT = """
+(element, color) => {
+    const original = {
+        outline: element.style.outline,
+        outlineOffset: element.style.outlineOffset,
+        transition: element.style.transition,
+        zIndex: element.style.zIndex
+    };
+    element.style.outline = `3px solid ${color}`;
+    element.style.outlineOffset = '2px';
+    element.style.transition = 'outline 0.3s ease';
+    element.style.zIndex = '9999';
+    return original;
+}
+"""
+
+# Восстановить стиль после подсветки
+_JS_RESTORE_STYLE = """
+(element, original) => {
+    element.style.outline = original.outline;
+    element.style.outlineOffset = original.outlineOffset;
+    element.style.transition = original.transition;
+    element.style.zIndex = original.zIndex;
+}
+"""
+
+# Сигнатура страницы для определения изменений
+_JS_PAGE_SIG = """
+() => {
+    return document.documentElement ? document.documentElement.outerHTML.slice(0, 1000) : '';
+}
+"""
+
 
 class RecoveryStrategy:
     """Система восстановления после ошибок"""
@@ -1117,40 +1365,18 @@ class BrowserController:
             return
         
         try:
-            # Сохраняем оригинальный стиль
-            original_style = await element.evaluate("""
-                element => {
-                    return {
-                        outline: element.style.outline,
-                        outlineOffset: element.style.outlineOffset,
-                        transition: element.style.transition,
-                        zIndex: element.style.zIndex
-                    };
-                }
-            """)
-            
-            # Применяем подсветку
-            await element.evaluate(f"""
-                element => {{
-                    element.style.outline = '3px solid {color}';
-                    element.style.outlineOffset = '2px';
-                    element.style.transition = 'outline 0.3s ease';
-                    element.style.zIndex = '9999';
-                }}
-            """)
+            # Применяем подсветку, сохраняя оригинальный стиль
+            original_style = await element.evaluate(
+                _JS_HIGHLIGHT, color
+            )
             
             # Ждем указанное время
             await asyncio.sleep(duration)
             
             # Восстанавливаем оригинальный стиль
-            await element.evaluate("""
-                (element, original) => {
-                    element.style.outline = original.outline;
-                    element.style.outlineOffset = original.outlineOffset;
-                    element.style.transition = original.transition;
-                    element.style.zIndex = original.zIndex;
-                }
-            """, original_style)
+            await element.evaluate(
+                _JS_RESTORE_STYLE, original_style
+            )
             
         except Exception as e:
             print(f"   ⚠️  Ошибка подсветки элемента: {e}")
@@ -1195,106 +1421,7 @@ class BrowserController:
             self.last_page_hash = current_hash
             
             # Получаем интерактивные элементы через JavaScript
-            interactive_elements = await self.page.evaluate("""
-                () => {
-                    const elements = [];
-                    const selectors = [
-                        'a', 'button', 'input[type="button"]', 'input[type="submit"]',
-                        '[role="button"]', '[role="link"]', '[role="tab"]',
-                        'input[type="text"]', 'input[type="email"]', 
-                        'input[type="password"]', 'input[type="search"]',
-                        'textarea', 'select', '[contenteditable="true"]',
-                        'input:not([type])', 'div[onclick]', 'span[onclick]',
-                        '[data-testid]', '[data-qa]', '[data-test]',
-                        '[role="menuitem"]', '[role="option"]', '[role="radio"]',
-                        '[role="checkbox"]', '[type="radio"]', '[type="checkbox"]'
-                    ];
-                    
-                    // Собираем видимые элементы
-                    selectors.forEach(selector => {
-                        const nodeList = document.querySelectorAll(selector);
-                        for (const el of nodeList) {
-                            const rect = el.getBoundingClientRect();
-                            const style = window.getComputedStyle(el);
-                            
-                            // Проверяем видимость
-                            if (rect.width > 0 && rect.height > 0 &&
-                                style.display !== 'none' &&
-                                style.visibility !== 'hidden' &&
-                                style.opacity !== '0') {
-                                
-                                // Получаем текст элемента
-                                let text = '';
-                                if (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' || el.tagName === 'SELECT') {
-                                    text = el.placeholder || el.value || el.name || el.id || el.getAttribute('aria-label') || '';
-                                } else {
-                                    text = el.innerText?.trim() || 
-                                           el.textContent?.trim() || 
-                                           el.getAttribute('aria-label') || 
-                                           el.title || 
-                                           el.alt || 
-                                           el.getAttribute('data-text') || '';
-                                }
-                                
-                                // Фильтруем пустые или слишком длинные тексты
-                                if (text && text.length > 0 && text.length < 100) {
-                                    const isInput = el.tagName === 'INPUT' || el.tagName === 'TEXTAREA' || el.tagName === 'SELECT';
-                                    const isButton = el.tagName === 'BUTTON' || 
-                                                    el.getAttribute('role') === 'button' ||
-                                                    (el.tagName === 'INPUT' && 
-                                                     (el.type === 'button' || el.type === 'submit')) ||
-                                                    el.hasAttribute('onclick');
-                                    const isLink = el.tagName === 'A' || el.getAttribute('role') === 'link';
-                                    const isCheckbox = el.type === 'checkbox' || el.getAttribute('role') === 'checkbox';
-                                    const isRadio = el.type === 'radio' || el.getAttribute('role') === 'radio';
-                                    
-                                    elements.push({
-                                        "text": text.replace(/\\n/g, ' ').substring(0, 80),
-                                        "tag": el.tagName.toLowerCase(),
-                                        "type": el.type || '',
-                                        "is_input": isInput,
-                                        "is_button": isButton,
-                                        "is_link": isLink,
-                                        "is_checkbox": isCheckbox,
-                                        "is_radio": isRadio,
-                                        "id": el.id || '',
-                                        "class": el.className.substring(0, 30) || '',
-                                        "visible": true,
-                                        "coordinates": {
-                                            "x": Math.round(rect.x),
-                                            "y": Math.round(rect.y),
-                                            "width": Math.round(rect.width),
-                                            "height": Math.round(rect.height)
-                                        }
-                                    });
-                                }
-                            }
-                        }
-                    });
-                    
-                    // Удаляем дубликаты по тексту и координатам
-                    const uniqueElements = [];
-                    const seenKeys = new Set();
-                    
-                    for (const elem of elements) {
-                        const key = `${elem.text.toLowerCase().trim()}_${elem.coordinates.x}_${elem.coordinates.y}`;
-                        if (key && !seenKeys.has(key) && elem.text.length > 1) {
-                            seenKeys.add(key);
-                            uniqueElements.push(elem);
-                        }
-                    }
-                    
-                    // Сортируем по позиции на странице (сверху вниз, слева направо)
-                    uniqueElements.sort((a, b) => {
-                        if (a.coordinates.y !== b.coordinates.y) {
-                            return a.coordinates.y - b.coordinates.y;
-                        }
-                        return a.coordinates.x - b.coordinates.x;
-                    });
-                    
-                    return uniqueElements.slice(0, 50); // Ограничиваем количество
-                }
-            """)
+            interactive_elements = await self.page.evaluate(_JS_INTERACTIVE_ELEMENTS)
             
             # Анализируем страницу для определения типа
             page_type = "unknown"
@@ -1404,15 +1531,7 @@ class BrowserController:
                     
                     # Проверяем, что элемент не перекрыт
                     try:
-                        is_hidden = await element.evaluate("""
-                            element => {
-                                const rect = element.getBoundingClientRect();
-                                const centerX = rect.left + rect.width / 2;
-                                const centerY = rect.top + rect.height / 2;
-                                const topElement = document.elementFromPoint(centerX, centerY);
-                                return topElement !== element && !element.contains(topElement);
-                            }
-                        """)
+                        is_hidden = await element.evaluate(_JS_IS_COVERED)
                         
                         if is_hidden:
                             print(f"   ⚠️  Элемент перекрыт другим элементом")
@@ -1485,7 +1604,7 @@ class BrowserController:
             lambda: self.page.locator(f'[data-id*="{search_text}"]'),
             
             # 11. Поиск по классу (последний вариант)
-            lambda: self.page.locator(f'.{search_text.replace(" ", ".").replace("-", ".")}'),
+            lambda: self.page.locator(f'.{search_text.translate(_CLASS_DOTS)}'),
         ]
         
         clicked = False
@@ -1514,15 +1633,7 @@ class BrowserController:
                     
                     # Проверяем, что элемент не перекрыт
                     try:
-                        is_hidden = await element.first.evaluate("""
-                            element => {
-                                const rect = element.getBoundingClientRect();
-                                const centerX = rect.left + rect.width / 2;
-                                const centerY = rect.top + rect.height / 2;
-                                const topElement = document.elementFromPoint(centerX, centerY);
-                                return topElement !== element && !element.contains(topElement);
-                            }
-                        """)
+                        is_hidden = await element.first.evaluate(_JS_IS_COVERED)
                         
                         if is_hidden:
                             print(f"   ⚠️  Элемент перекрыт другим элементом")
@@ -1567,6 +1678,9 @@ class BrowserController:
         """Альтернативные методы поиска элемента"""
         print(f"   🔍 Пробую альтернативный поиск: '{search_text}'")
         
+        lower_text = search_text.lower()
+        compact_text = search_text.translate(_NO_SPACE).lower()
+        
         alternative_selectors = [
             f'button:has-text("{search_text}")',
             f'input[type="button"][value*="{search_text}"]',
@@ -1576,12 +1690,12 @@ class BrowserController:
             f'span:has-text("{search_text}")',
             f'p:has-text("{search_text}")',
             f'li:has-text("{search_text}")',
-            f'*[onclick*="{search_text.lower()}"]',
+            f'*[onclick*="{lower_text}"]',
             f'*:contains("{search_text}")',
-            f'[class*="{search_text.lower().replace(" ", "")}"]',
-            f'[id*="{search_text.lower().replace(" ", "")}"]',
-            f'[name*="{search_text.lower().replace(" ", "")}"]',
-            f'[for*="{search_text.lower().replace(" ", "")}"]',
+            f'[class*="{compact_text}"]',
+            f'[id*="{compact_text}"]',
+            f'[name*="{compact_text}"]',
+            f'[for*="{compact_text}"]',
         ]
         
         for selector in alternative_selectors:
@@ -1595,9 +1709,7 @@ class BrowserController:
                     await asyncio.sleep(0.3)
                     
                     # Проверяем, можно ли кликнуть
-                    is_disabled = await element.first.evaluate("""
-                        element => element.disabled || element.getAttribute('aria-disabled') === 'true'
-                    """)
+                    is_disabled = await element.first.evaluate(_JS_IS_DISABLED)
                     
                     if is_disabled:
                         print(f"   ⚠️  Элемент disabled, пропускаем")
@@ -1613,6 +1725,21 @@ class BrowserController:
         
         return False, "Элемент не найден"
     
+    async def _type_into_password_field(self, field, text: str) -> bool:
+        """Ввести текст в поле пароля, если оно видимо."""
+        try:
+            if not await field.is_visible():
+                return False
+            await self.highlight_element(field, color="#ff6600")
+            await field.scroll_into_view_if_needed()
+            await field.click()
+            await field.fill('')
+            await field.type(text, delay=30)
+            print(f"   🔐 Ввод в поле пароля")
+            return True
+        except:
+            return False
+    
     async def type_text(self, text: str) -> Tuple[bool, bool]:
         """Ввести текст в активное поле"""
         if not self.page:
@@ -1625,23 +1752,42 @@ class BrowserController:
             # Обрабатываем попапы перед вводом
             await self.popup_manager.handle_popups()
             
-            # Сначала проверяем поля пароля
-            password_fields = await self.page.query_selector_all('input[type="password"]')
+            # Сначала проверяем поля пароля: первое видимое поле ищем одним запросом к DOM.
+            # Видимость проверяется как в is_visible() Playwright: visibility и ненулевая рамка
+            # (без offsetParent, иначе теряются поля с position: fixed)
+            visible_field = None
+            try:
+                handle = await self.page.evaluate_handle("""
+                    () => {
+                        const fields = document.querySelectorAll('input[type="password"]');
+                        for (const el of fields) {
+                            const rect = el.getBoundingClientRect();
+                            if (rect.width > 0 && rect.height > 0 &&
+                                getComputedStyle(el).visibility === 'visible') {
+                                return el;
+                            }
+                        }
+                        return fields.length > 0;
+                    }
+                """)
+                visible_field = handle.as_element()
+                if visible_field is None:
+                    # Видимого поля нет: JS вернул признак наличия полей пароля
+                    is_password_field = bool(await handle.json_value())
+                    await handle.dispose()
+                else:
+                    is_password_field = True
+            except Exception:
+                is_password_field = bool(await self.page.query_selector_all('input[type="password"]'))
             
-            if password_fields:
-                is_password_field = True
-                for field in password_fields:
-                    try:
-                        if await field.is_visible():
-                            await self.highlight_element(field, color="#ff6600")
-                            await field.scroll_into_view_if_needed()
-                            await field.click()
-                            await field.fill('')
-                            await field.type(text, delay=30)
-                            print(f"   🔐 Ввод в поле пароля")
-                            return True, is_password_field
-                    except:
-                        continue
+            if is_password_field:
+                if visible_field is not None and await self._type_into_password_field(visible_field, text):
+                    return True, is_password_field
+                
+                # Запасной вариант: перебор всех полей пароля с проверкой is_visible()
+                for field in await self.page.query_selector_all('input[type="password"]'):
+                    if await self._type_into_password_field(field, text):
+                        return True, is_password_field
             
             # Затем проверяем другие поля ввода
             input_selectors = [
@@ -1759,69 +1905,7 @@ class BrowserController:
             return ""
         
         try:
-            text = await self.page.evaluate("""
-                () => {
-                    // Функция для извлечения видимого текста
-                    function extractVisibleText(node) {
-                        let text = '';
-                        
-                        // Рекурсивно обходим дерево
-                        const walker = document.createTreeWalker(
-                            node,
-                            NodeFilter.SHOW_TEXT,
-                            {
-                                acceptNode: function(node) {
-                                    // Пропускаем скрытые элементы
-                                    const parent = node.parentElement;
-                                    if (!parent) return NodeFilter.FILTER_REJECT;
-                                    
-                                    const style = window.getComputedStyle(parent);
-                                    if (parent.offsetParent === null ||
-                                        style.display === 'none' ||
-                                        style.visibility === 'hidden' ||
-                                        style.opacity === '0' ||
-                                        parent.hidden ||
-                                        parent.closest('[hidden]')) {
-                                        return NodeFilter.FILTER_REJECT;
-                                    }
-                                    
-                                    // Пропускаем пустой текст
-                                    const nodeText = node.textContent.trim();
-                                    if (nodeText.length === 0) {
-                                        return NodeFilter.FILTER_REJECT;
-                                    }
-                                    
-                                    // Пропускаем скрипты и стили
-                                    if (parent.tagName === 'SCRIPT' || 
-                                        parent.tagName === 'STYLE' ||
-                                        parent.tagName === 'NOSCRIPT' ||
-                                        parent.tagName === 'SVG' ||
-                                        parent.tagName === 'PATH') {
-                                        return NodeFilter.FILTER_REJECT;
-                                    }
-                                    
-                                    // Пропускаем слишком маленькие элементы (иконки и т.д.)
-                                    const rect = parent.getBoundingClientRect();
-                                    if (rect.width < 5 && rect.height < 5) {
-                                        return NodeFilter.FILTER_REJECT;
-                                    }
-                                    
-                                    return NodeFilter.FILTER_ACCEPT;
-                                }
-                            }
-                        );
-                        
-                        let currentNode;
-                        while (currentNode = walker.nextNode()) {
-                            text += currentNode.textContent.trim() + ' ';
-                        }
-                        
-                        return text.replace(/\\s+/g, ' ').trim();
-                    }
-                    
-                    return extractVisibleText(document.body);
-                }
-            """)
+            text = await self.page.evaluate(_JS_PAGE_TEXT)
             
             return text[:3000]  # Ограничиваем объем
             
@@ -1845,8 +1929,8 @@ class BrowserController:
             if hasattr(self, 'recovery_strategy'):
                 report = self.recovery_strategy.get_recovery_report()
                 os.makedirs("logs", exist_ok=True)
-                with open("logs/recovery_report.json", 'w', encoding='utf-8') as f:
-                    json.dump(report, f, indent=2, ensure_ascii=False)
+                # Пишем в отдельном потоке, чтобы не блокировать event loop
+                await asyncio.to_thread(_write_bytes, "logs/recovery_report.json", _dump_report(report))
                 print(f"📊 Отчет о восстановлениях сохранен")
             
             if self.page:
@@ -1885,9 +1969,9 @@ class BrowserController:
             return ""
         
         try:
-            content = await self.page.content()
+            signature = await self.page.evaluate(_JS_PAGE_SIG)
             # Используем упрощенный хэш
-            return str(hash(content[:1000]))
+            return str(hash(signature))
         except:
             return ""
 
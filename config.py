@@ -1,88 +1,137 @@
 import os
-from dataclasses import dataclass
-from dotenv import load_dotenv
+from dataclasses import dataclass, field
+from functools import lru_cache, partial
 import hashlib
 from enum import Enum
-from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Awaitable, Final
 
-load_dotenv()
+# .env разбираем один раз на процесс: дочерние процессы наследуют переменные,
+# а при отсутствии файла парсер не вызывается вовсе
+if not os.environ.get("DOTENV_LOADED"):
+    from dotenv import find_dotenv, load_dotenv
+    _dotenv_path = find_dotenv()
+    if _dotenv_path:
+        load_dotenv(_dotenv_path)
+    os.environ["DOTENV_LOADED"] = "1"
 
 class SecurityLevel(Enum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
-@dataclass
+
+# Папки, уже созданные или проверенные в этом процессе
+_DIRS_ENSURED: Set[str] = set()
+
+
+def _ensure_dir(path: str) -> None:
+    """Создать папку один раз за процесс, без повторных stat/mkdir."""
+    if not path or path in _DIRS_ENSURED:
+        return
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+    _DIRS_ENSURED.add(path)
+
+
+def _parse_bool(value: str) -> bool:
+    return value.lower() == "true"
+
+
+def _parse_security_level(value: str) -> SecurityLevel:
+    return SecurityLevel(value.lower())
+
+
+@lru_cache(maxsize=None)
+def _env(name: str, default: str, cast: Callable[[str], Any] = str) -> Any:
+    """Прочитать и преобразовать переменную окружения (один раз на процесс)"""
+    return cast(os.getenv(name, default))
+
+
+def _from_env(name: str, default: str, cast: Callable[[str], Any] = str):
+    """Поле конфигурации, значение которого берется из окружения"""
+    return field(default_factory=partial(_env, name, default, cast))
+
+
+# Поддерживаемые AI провайдеры: префикс полей конфигурации и описание
+_AI_PROVIDERS: Dict[str, Tuple[str, str]] = {
+    "MISTRAL": ("mistral", "Mistral через OpenAI-совместимый API"),
+    "OPENAI": ("openai", "OpenAI"),
+}
+
+# Допустимые диапазоны числовых параметров: (переменная окружения, min, max)
+_RANGES: Tuple[Tuple[str, float, float], ...] = (
+    ("SLOW_MO", 0, 5000),
+    ("AGENT_MAX_STEPS", 1, 1000),
+    ("AGENT_TEMPERATURE", 0, 2),
+    ("POPUP_CLOSE_TIMEOUT", 100, 10000),
+    ("SPA_LOAD_TIMEOUT", 1000, 30000),
+)
+
+
+# Синглтон: сравнение экземпляров не нужно, поэтому __eq__/__hash__ не генерируем
+@dataclass(frozen=True, slots=True, eq=False)
 class Config:
     """Конфигурация приложения"""
     
     # AI Provider
-    ai_provider: str = os.getenv("AI_PROVIDER", "OPENAI").upper()
+    ai_provider: str = _from_env("AI_PROVIDER", "OPENAI", str.upper)
     
     # Mistral (через OpenAI-совместимый API)
-    mistral_api_key: str = os.getenv("MISTRAL_API_KEY", "")
-    mistral_model: str = os.getenv("MISTRAL_MODEL", "mistral-large-latest")
-    mistral_base_url: str = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
+    mistral_api_key: str = _from_env("MISTRAL_API_KEY", "")
+    mistral_model: str = _from_env("MISTRAL_MODEL", "mistral-large-latest")
+    mistral_base_url: str = _from_env("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
     
     # OpenAI
-    openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
-    openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
-    openai_base_url: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    openai_api_key: str = _from_env("OPENAI_API_KEY", "")
+    openai_model: str = _from_env("OPENAI_MODEL", "gpt-4-turbo-preview")
+    openai_base_url: str = _from_env("OPENAI_BASE_URL", "https://api.openai.com/v1")
     
     # Browser
-    headless: bool = os.getenv("HEADLESS", "false").lower() == "true"
-    slow_mo: int = int(os.getenv("SLOW_MO", "1000"))
-    user_data_dir: str = os.path.abspath(os.getenv("USER_DATA_DIR", "./browser_data"))
+    headless: bool = _from_env("HEADLESS", "false", _parse_bool)
+    slow_mo: int = _from_env("SLOW_MO", "1000", int)
+    user_data_dir: str = _from_env("USER_DATA_DIR", "./browser_data", os.path.abspath)
     
     # Security
-    security_level: SecurityLevel = SecurityLevel(os.getenv("SECURITY_LEVEL", "medium").lower())
-    security_log_file: str = os.getenv("SECURITY_LOG_FILE", "security_log.json")
+    security_level: SecurityLevel = _from_env("SECURITY_LEVEL", "medium", _parse_security_level)
+    security_log_file: str = _from_env("SECURITY_LOG_FILE", "security_log.json")
     
     # Agent
-    agent_max_steps: int = int(os.getenv("AGENT_MAX_STEPS", "200"))
-    agent_temperature: float = float(os.getenv("AGENT_TEMPERATURE", "0.1"))
-    agent_max_tokens: int = int(os.getenv("AGENT_MAX_TOKENS", "1000"))
+    agent_max_steps: int = _from_env("AGENT_MAX_STEPS", "200", int)
+    agent_temperature: float = _from_env("AGENT_TEMPERATURE", "0.1", float)
+    agent_max_tokens: int = _from_env("AGENT_MAX_TOKENS", "1000", int)
     
     # Browser Automation
-    browser_timeout: int = int(os.getenv("BROWSER_TIMEOUT", "30000"))
-    default_viewport_width: int = int(os.getenv("DEFAULT_VIEWPORT_WIDTH", "1280"))
-    default_viewport_height: int = int(os.getenv("DEFAULT_VIEWPORT_HEIGHT", "800"))
+    browser_timeout: int = _from_env("BROWSER_TIMEOUT", "30000", int)
+    default_viewport_width: int = _from_env("DEFAULT_VIEWPORT_WIDTH", "1280", int)
+    default_viewport_height: int = _from_env("DEFAULT_VIEWPORT_HEIGHT", "800", int)
     
     # 🆕 Новые настройки для управления попапами
-    auto_close_popups: bool = os.getenv("AUTO_CLOSE_POPUPS", "true").lower() == "true"
-    skip_login_popups: bool = os.getenv("SKIP_LOGIN_POPUPS", "true").lower() == "true"
-    popup_close_timeout: int = int(os.getenv("POPUP_CLOSE_TIMEOUT", "2000"))
-    max_popups_per_page: int = int(os.getenv("MAX_POPUPS_PER_PAGE", "5"))
+    auto_close_popups: bool = _from_env("AUTO_CLOSE_POPUPS", "true", _parse_bool)
+    skip_login_popups: bool = _from_env("SKIP_LOGIN_POPUPS", "true", _parse_bool)
+    popup_close_timeout: int = _from_env("POPUP_CLOSE_TIMEOUT", "2000", int)
+    max_popups_per_page: int = _from_env("MAX_POPUPS_PER_PAGE", "5", int)
     
     # 🆕 Настройки для работы с SPA
-    wait_for_spa_load: bool = os.getenv("WAIT_FOR_SPA_LOAD", "true").lower() == "true"
-    spa_load_timeout: int = int(os.getenv("SPA_LOAD_TIMEOUT", "5000"))
-    detect_spa_frameworks: bool = os.getenv("DETECT_SPA_FRAMEWORKS", "true").lower() == "true"
+    wait_for_spa_load: bool = _from_env("WAIT_FOR_SPA_LOAD", "true", _parse_bool)
+    spa_load_timeout: int = _from_env("SPA_LOAD_TIMEOUT", "5000", int)
+    detect_spa_frameworks: bool = _from_env("DETECT_SPA_FRAMEWORKS", "true", _parse_bool)
     
     # 🆕 Настройки для улучшенного поиска элементов
-    enhanced_element_detection: bool = os.getenv("ENHANCED_ELEMENT_DETECTION", "true").lower() == "true"
-    element_detection_timeout: int = int(os.getenv("ELEMENT_DETECTION_TIMEOUT", "5000"))
+    enhanced_element_detection: bool = _from_env("ENHANCED_ELEMENT_DETECTION", "true", _parse_bool)
+    element_detection_timeout: int = _from_env("ELEMENT_DETECTION_TIMEOUT", "5000", int)
     
     def validate(self) -> None:
         """Проверка конфигурации"""
         # AI Provider проверка
-        if self.ai_provider == "MISTRAL":
-            if not self.mistral_api_key:
-                raise ValueError("MISTRAL_API_KEY не установлен")
-            print(f"   🔧 Используется Mistral через OpenAI-совместимый API")
-            print(f"   🔗 Base URL: {self.mistral_base_url}")
-            print(f"   🧠 Model: {self.mistral_model}")
-        elif self.ai_provider == "OPENAI":
-            if not self.openai_api_key:
-                raise ValueError("OPENAI_API_KEY не установлен")
-            print(f"   🔧 Используется OpenAI")
-            print(f"   🔗 Base URL: {self.openai_base_url}")
-            print(f"   🧠 Model: {self.openai_model}")
-        else:
-            raise ValueError(f"Неподдерживаемый AI провайдер: {self.ai_provider}")
-        
-        if self.ai_provider not in ["MISTRAL", "OPENAI"]:
+        provider = _AI_PROVIDERS.get(self.ai_provider)
+        if provider is None:
             raise ValueError(f"Неподдерживаемый AI провайдер: {self.ai_provider}")
+        prefix, description = provider
+        if not getattr(self, f"{prefix}_api_key"):
+            raise ValueError(f"{self.ai_provider}_API_KEY не установлен")
+        print(f"   🔧 Используется {description}")
+        print(f"   🔗 Base URL: {getattr(self, f'{prefix}_base_url')}")
+        print(f"   🧠 Model: {getattr(self, f'{prefix}_model')}")
         
         # Security проверка
         if not isinstance(self.security_level, SecurityLevel):
@@ -93,29 +142,15 @@ class Config:
             )
         
         # Числовые значения проверка
-        if self.slow_mo < 0 or self.slow_mo > 5000:
-            raise ValueError("SLOW_MO должен быть между 0 и 5000")
-        
-        if self.agent_max_steps < 1 or self.agent_max_steps > 1000:
-            raise ValueError("AGENT_MAX_STEPS должен быть между 1 и 1000")
-        
-        if self.agent_temperature < 0 or self.agent_temperature > 2:
-            raise ValueError("AGENT_TEMPERATURE должен быть между 0 и 2")
-        
-        if self.popup_close_timeout < 100 or self.popup_close_timeout > 10000:
-            raise ValueError("POPUP_CLOSE_TIMEOUT должен быть между 100 и 10000")
-        
-        if self.spa_load_timeout < 1000 or self.spa_load_timeout > 30000:
-            raise ValueError("SPA_LOAD_TIMEOUT должен быть между 1000 и 30000")
+        for name, lo, hi in _RANGES:
+            if not lo <= getattr(self, name.lower()) <= hi:
+                raise ValueError(f"{name} должен быть между {lo} и {hi}")
         
         # Создаем папку для данных браузера, если её нет
-        if self.user_data_dir:
-            os.makedirs(self.user_data_dir, exist_ok=True)
+        _ensure_dir(self.user_data_dir)
         
         # Создаем папку для логов безопасности
-        log_dir = os.path.dirname(self.security_log_file)
-        if log_dir:
-            os.makedirs(log_dir, exist_ok=True)
+        _ensure_dir(os.path.dirname(self.security_log_file))
         
         print(f"✅ Конфигурация загружена:")
         print(f"   🤖 AI: {self.ai_provider}")
@@ -126,4 +161,4 @@ class Config:
         print(f"   ⚡ Обнаружение SPA: {'Вкл' if self.wait_for_spa_load else 'Выкл'}")
 
 
-config = Config()
\ No newline at end of file
+config: Final[Config] = Config()
\ No newline at end of file
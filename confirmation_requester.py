@@ -2,9 +2,13 @@
 Запрос подтверждений действий у пользователя.
 """
 import asyncio
-from typing import Dict, Any, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Set, Tuple, Optional
 from .interfaces import IConfirmationRequester, ActionType, SecurityRule, RiskAssessment
-from .utils import mask_sensitive_data, generate_action_hash
+from .utils import mask_sensitive_data, generate_action_hash, count_patterns
+
+# Отдельный поток для ввода: ожидание человека не занимает общий пул исполнителя
+_INPUT_EXEC = ThreadPoolExecutor(max_workers=1, thread_name_prefix="user-input")
 
 class AsyncInputProvider:
     """Асинхронный провайдер ввода от пользователя."""
@@ -12,13 +16,49 @@ class AsyncInputProvider:
     @staticmethod
     async def get_input(prompt: str) -> str:
         """Асинхронно получить ввод от пользователя."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, input, prompt)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_INPUT_EXEC, input, prompt)
+
+# Элемент группового подтверждения: аргументы request_confirmation
+ConfirmationItem = Tuple[ActionType, str, RiskAssessment, Dict[str, Any], List[SecurityRule]]
+
+# Неизменяемые части сообщений подтверждения
+_ALERT_HEADER = "🔒 SECURITY ALERT - Требуется подтверждение\n" + "=" * 70
+_DECISION_MENU = (
+    "\n📋 ВАРИАНТЫ:\n"
+    "  y - Разрешить это действие\n"
+    "  n - Заблокировать это действие\n"
+    "  a - Разрешить все подобные действия в этой сессии\n"
+    "  d - Показать детали\n"
+    "  q - Прервать задачу"
+)
+
+# Флаги типа страницы в порядке приоритета -> краткое имя для сводки
+_PAGE_TYPE_KEYS = (
+    ("is_login_page", "login"),
+    ("is_payment_page", "payment"),
+    ("is_registration_page", "registration"),
+    ("is_settings_page", "settings"),
+    ("is_social_page", "social"),
+)
+
+# Коды ответа пользователя -> результат подтверждения
+_DECISIONS = {
+    'y': (True, "approved"),
+    'a': (True, "approved_all"),
+    'n': (False, "blocked"),
+    'q': (False, "task_aborted"),
+}
 
 class ConfirmationRequester(IConfirmationRequester):
-    def __init__(self, input_provider=None):
+    def __init__(self, input_provider=None, batch_window: float = 0.2):
         self.input_provider = input_provider or AsyncInputProvider()
-        self.auto_confirm_hashes = set()
+        self.auto_confirm_hashes: Set[int] = set()
+        
+        # Групповые подтверждения: действия, пришедшие в пределах окна, объединяются
+        self.batch_window = batch_window
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batch_task: Optional[asyncio.Task] = None
     
     async def request_confirmation(self, action_type: ActionType, target: str,
                                   risk_assessment: RiskAssessment, context: Dict[str, Any],
@@ -39,7 +79,137 @@ class ConfirmationRequester(IConfirmationRequester):
         )
         
         # Детали для отображения
-        details = {
+        details = self._build_details(action_type, masked_target, risk_assessment, context, triggered_rules)
+        
+        # Запрашиваем подтверждение
+        return await self._get_user_decision(message, details, risk_assessment.level)
+    
+    async def enqueue_confirmation(self, action_type: ActionType, target: str,
+                                   risk_assessment: RiskAssessment, context: Dict[str, Any],
+                                   triggered_rules: List[SecurityRule]) -> Tuple[bool, Optional[str]]:
+        """Поставить действие в очередь на групповое подтверждение."""
+        if self._batch_queue is None:
+            self._batch_queue = asyncio.Queue()
+        
+        future = asyncio.get_running_loop().create_future()
+        item = (action_type, target, risk_assessment, context, triggered_rules)
+        await self._batch_queue.put((item, future))
+        
+        if self._batch_task is None or self._batch_task.done():
+            self._batch_task = asyncio.create_task(self._drain_batches())
+        
+        return await future
+    
+    async def _drain_batches(self) -> None:
+        """Собрать действия из очереди до паузы и подтвердить их одним запросом."""
+        pending: List[Tuple[ConfirmationItem, asyncio.Future]] = []
+        try:
+            while not self._batch_queue.empty():
+                pending = [await self._batch_queue.get()]
+                while True:
+                    try:
+                        pending.append(
+                            await asyncio.wait_for(self._batch_queue.get(), timeout=self.batch_window)
+                        )
+                    except asyncio.TimeoutError:
+                        break
+                
+                items = [item for item, _ in pending]
+                try:
+                    results = await self.request_confirmations_batch(items)
+                except Exception as e:
+                    print(f"❌ Ошибка группового подтверждения: {e}")
+                    results = [(False, "input_error")] * len(items)
+                
+                for (_, future), result in zip(pending, results):
+                    if not future.done():
+                        future.set_result(result)
+                pending = []
+        except asyncio.CancelledError:
+            # Вызывающие не должны ждать вечно: все ожидающие действия отклоняются
+            while not self._batch_queue.empty():
+                pending.append(self._batch_queue.get_nowait())
+            for _, future in pending:
+                if not future.done():
+                    future.set_result((False, "cancelled"))
+            raise
+    
+    async def request_confirmations_batch(self, items: List[ConfirmationItem]) -> List[Tuple[bool, Optional[str]]]:
+        """Запросить подтверждение группы действий одним запросом."""
+        results: List[Tuple[bool, Optional[str]]] = [(True, "previously_confirmed")] * len(items)
+        hashes = [generate_action_hash(item[0], item[1], item[3]) for item in items]
+        pending = [i for i, h in enumerate(hashes) if h not in self.auto_confirm_hashes]
+        
+        if not pending:
+            return results
+        
+        # Одно действие - обычный запрос
+        if len(pending) == 1:
+            i = pending[0]
+            results[i] = await self.request_confirmation(*items[i])
+            return results
+        
+        print(self._format_batch_message([items[i] for i in pending]))
+        
+        while True:
+            print("\n📋 ВАРИАНТЫ:")
+            print("  y / n / a / q - применить ко всем действиям")
+            print("  y,n,a,... - решение для каждого действия по порядку")
+            print("  d - показать детали")
+            
+            try:
+                response_raw = await self.input_provider.get_input("\nВаш выбор: ")
+                response = str(response_raw).lower().strip() if response_raw else ""
+            except (KeyboardInterrupt, EOFError):
+                print("\n⏹️  Прервано пользователем")
+                decisions = [(False, "interrupted")] * len(pending)
+                break
+            except Exception as e:
+                print(f"❌ Ошибка ввода: {e}")
+                decisions = [(False, "input_error")] * len(pending)
+                break
+            
+            if response == 'd':
+                for n, i in enumerate(pending, 1):
+                    action_type, target, risk_assessment, context, triggered_rules = items[i]
+                    print(f"\n📊 ДЕТАЛИ ({n}):")
+                    details = self._build_details(
+                        action_type, mask_sensitive_data(target), risk_assessment, context, triggered_rules
+                    )
+                    for key, value in details.items():
+                        print(f"  {key}: {value}")
+                continue
+            
+            decisions = self._parse_batch_response(response, len(pending))
+            if decisions is not None:
+                break
+            print("❓ Неверный выбор. Попробуйте снова.")
+        
+        for i, decision in zip(pending, decisions):
+            results[i] = decision
+        
+        # Запоминаем все действия, разрешенные "для всей сессии"
+        self.auto_confirm_hashes.update(
+            hashes[i] for i, (_, reason) in zip(pending, decisions) if reason == "approved_all"
+        )
+        
+        return results
+    
+    @staticmethod
+    def _parse_batch_response(response: str, count: int) -> Optional[List[Tuple[bool, str]]]:
+        """Разобрать ответ на групповой запрос: один код для всех или список кодов."""
+        codes = [code.strip() for code in response.removeprefix("all-").split(",")]
+        if len(codes) == 1:
+            codes *= count
+        if len(codes) != count or any(code not in _DECISIONS for code in codes):
+            return None
+        return [_DECISIONS[code] for code in codes]
+    
+    def _build_details(self, action_type: ActionType, masked_target: str,
+                       risk_assessment: RiskAssessment, context: Dict[str, Any],
+                       triggered_rules: List[SecurityRule]) -> Dict[str, Any]:
+        """Собрать детали действия для показа по запросу 'd'."""
+        return {
             "action_type": action_type.value,
             "target": masked_target,
             "risk_score": risk_assessment.score,
@@ -47,56 +217,59 @@ class ConfirmationRequester(IConfirmationRequester):
             "triggered_rules": [r.name for r in triggered_rules],
             "context_summary": self._summarize_context(context),
         }
-        
-        # Запрашиваем подтверждение
-        return await self._get_user_decision(message, details, risk_assessment.level)
+    
+    def _format_batch_message(self, items: List[ConfirmationItem]) -> str:
+        """Форматировать сообщение для группового подтверждения."""
+        lines = [f"🔒 SECURITY ALERT - Требуется подтверждение {len(items)} действий", "=" * 70]
+        for n, (action_type, target, risk_assessment, _, _) in enumerate(items, 1):
+            lines.append(
+                f"  {n}. [{risk_assessment.level.upper()} {risk_assessment.score:.1f}] "
+                f"{action_type.value}: {mask_sensitive_data(target)[:100]}"
+            )
+        return "\n".join(lines)
     
     def _format_confirmation_message(self, action_type: ActionType, target: str,
                                     risk_assessment: RiskAssessment,
                                     triggered_rules: List[SecurityRule],
                                     context: Dict[str, Any]) -> str:
         """Форматировать сообщение для подтверждения."""
-        lines = []
-        lines.append("🔒 SECURITY ALERT - Требуется подтверждение")
-        lines.append("=" * 70)
-        lines.append(f"\n📊 ОЦЕНКА РИСКА: {risk_assessment.level.upper()} ({risk_assessment.score:.1f}/100)")
-        
         # Правила
+        rules_block = ""
         if triggered_rules:
-            lines.append("\n📜 Сработавшие правила безопасности:")
-            for rule in triggered_rules[:5]:
-                lines.append(f"  ⚠️  {rule.message} [{rule.risk_level.upper()}]")
+            rules_block = "\n\n📜 Сработавшие правила безопасности:\n" + "\n".join(
+                f"  ⚠️  {rule.message} [{rule.risk_level.upper()}]" for rule in triggered_rules[:5]
+            )
             if len(triggered_rules) > 5:
-                lines.append(f"  ... и ещё {len(triggered_rules) - 5} правил")
-        
-        # Детали действия
-        lines.append(f"\n🎯 ДЕЙСТВИЕ: {action_type.value}")
-        lines.append(f"📝 ЦЕЛЬ: {target[:200]}")
+                rules_block += f"\n  ... и ещё {len(triggered_rules) - 5} правил"
         
         # Контекст
-        if context.get("current_url"):
-            lines.append(f"🌐 URL: {context['current_url'][:100]}")
+        url_block = f"\n🌐 URL: {context['current_url'][:100]}" if context.get("current_url") else ""
         
         # Рекомендации
+        recs_block = ""
         if risk_assessment.recommendations:
-            lines.append(f"\n💡 РЕКОМЕНДАЦИИ:")
-            for rec in risk_assessment.recommendations:
-                lines.append(f"  • {rec}")
+            recs_block = "\n\n💡 РЕКОМЕНДАЦИИ:\n" + "\n".join(
+                f"  • {rec}" for rec in risk_assessment.recommendations
+            )
         
-        return "\n".join(lines)
+        return (
+            f"{_ALERT_HEADER}\n"
+            f"\n📊 ОЦЕНКА РИСКА: {risk_assessment.level.upper()} ({risk_assessment.score:.1f}/100)"
+            f"{rules_block}\n"
+            f"\n🎯 ДЕЙСТВИЕ: {action_type.value}\n"
+            f"📝 ЦЕЛЬ: {target[:200]}"
+            f"{url_block}{recs_block}"
+        )
     
     def _summarize_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Создать краткое описание контекста."""
         summary = {}
         
-        # Тип страницы
-        page_types = []
-        for key in ["is_login_page", "is_payment_page", "is_registration_page",
-                   "is_settings_page", "is_social_page"]:
+        # Тип страницы: первый сработавший по приоритету
+        for key, page_type in _PAGE_TYPE_KEYS:
             if context.get(key):
-                page_types.append(key.replace("is_", "").replace("_page", ""))
-        if page_types:
-            summary["page_type"] = page_types[0]
+                summary["page_type"] = page_type
+                break
         
         # Домен
         if context.get("domain"):
@@ -104,10 +277,7 @@ class ConfirmationRequester(IConfirmationRequester):
         
         # Паттерны
         if context.get("detected_patterns"):
-            patterns = context["detected_patterns"]
-            pattern_count = sum(len(matches) for category in patterns.values() 
-                              for matches in category.values())
-            summary["detected_patterns_count"] = pattern_count
+            summary["detected_patterns_count"] = count_patterns(context["detected_patterns"])
         
         return summary
     
@@ -117,12 +287,7 @@ class ConfirmationRequester(IConfirmationRequester):
         print(message)
         
         while True:
-            print("\n📋 ВАРИАНТЫ:")
-            print("  y - Разрешить это действие")
-            print("  n - Заблокировать это действие")
-            print("  a - Разрешить все подобные действия в этой сессии")
-            print("  d - Показать детали")
-            print("  q - Прервать задачу")
+            print(_DECISION_MENU)
             
             try:
                 # Ждем ввод пользователя
@@ -162,6 +327,6 @@ class ConfirmationRequester(IConfirmationRequester):
                 print(f"❌ Ошибка ввода: {e}")
                 return False, "input_error"
     
-    async def set_auto_confirm(self, action_hash: str) -> None:
+    async def set_auto_confirm(self, action_hash: int) -> None:
         """Установить автоподтверждение для действия."""
         self.auto_confirm_hashes.add(action_hash)
\ No newline at end of file
@@ -1,59 +1,195 @@
 """
 Анализ контекста действий.
 """
-from typing import Dict, Any, List, Optional
-from security.interfaces import IContextAnalyzer, ActionType, IPatternMatcher
-from security.utils import is_external_domain, is_suspicious_domain, extract_domain
+import re
+import sys
+from collections import OrderedDict
+from copy import deepcopy
+from typing import Dict, Any, List, Optional, Pattern, Hashable, Tuple
+from security.interfaces import IContextAnalyzer, ActionType, IPatternMatcher, categories_for
+from security.utils import is_external_domain, is_suspicious_domain, extract_domain, count_patterns
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Значения типов действий, с которыми сравнивается история
+_TYPE_EMAIL = sys.intern(ActionType.TYPE_EMAIL.value)
+_TYPE_PASSWORD = sys.intern(ActionType.TYPE_PASSWORD.value)
+
+# Рекомендации по флагам контекста (в порядке вывода)
+_RECS = (
+    ("contains_passwords", "🔐 Обнаружен ввод пароля - будьте осторожны"),
+    ("contains_financial", "💰 Обнаружены финансовые данные - проверьте безопасность"),
+    ("is_external_domain", "🌍 Переход на внешний домен - убедитесь в его надежности"),
+    ("is_suspicious_domain", "🚫 Подозрительный домен - рекомендуется отменить переход"),
+)
+
+# Длинные цели (тексты страниц) не кэшируем - они почти не повторяются
+_CACHE_MAX_TARGET_LENGTH = 2000
+
+# Ключевые слова в тексте действия по категориям
+_KEYWORD_PATTERNS: Dict[str, Tuple[str, ...]] = {
+    "payment": ("купить", "оплатить", "цена", "стоимость", "чек", "checkout", "buy", "purchase", "cart", "корзин", "оплат"),
+    "login": ("войти", "вход", "логин", "sign in", "log in", "авторизация", "account", "аккаунт"),
+    "registration": ("регистрация", "зарегистрироваться", "sign up", "register", "создать аккаунт"),
+    "social": ("пост", "публикация", "поделиться", "share", "comment", "комментарий", "like", "лайк", "репост"),
+    "delete": ("удалить", "удаление", "стереть", "очистить", "delete", "remove", "clear", "отменить", "отмена"),
+    "download": ("скачать", "загрузить", "download", "upload", "файл", "документ"),
+    "legal": ("соглашение", "условия", "правила", "terms", "agreement", "policy", "политика"),
+    "contact": ("контакты", "обратная связь", "contact", "support", "поддержка"),
+    "search": ("поиск", "найти", "search", "find", "искать"),
+    "navigation": ("главная", "home", "назад", "back", "вперед", "forward", "меню", "menu"),
+    "settings": ("настройки", "settings", "профиль", "profile", "аккаунт", "account"),
+}
+
+# Ключевые слова в URL для определения типа страницы (поиск подстрок)
+_PAGE_TYPE_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "login": ("login", "signin", "auth", "вход", "войти", "account"),
+    "payment": ("checkout", "payment", "pay", "cart", "корзин", "оплат", "order"),
+    "registration": ("register", "signup", "регистрация", "create.account"),
+    "settings": ("settings", "настройки", "profile", "профиль", "account"),
+    "admin": ("admin", "админ", "dashboard", "панель", "control"),
+    "social": ("facebook", "twitter", "vk", "instagram", "tiktok", "social"),
+    "search": ("search", "поиск", "google", "yandex", "bing"),
+    "email": ("mail", "email", "почта", "gmail", "outlook"),
+}
+
+# Категории доменов
+_DOMAIN_CATEGORIES: Dict[str, Tuple[str, ...]] = {
+    "social": ("facebook.com", "twitter.com", "instagram.com", "vk.com", "tiktok.com", "linkedin.com"),
+    "shopping": ("amazon.com", "aliexpress.com", "ebay.com", "wildberries.ru", "ozon.ru", "yandex.market"),
+    "banking": ("sberbank.ru", "tinkoff.ru", "alfabank.ru", "vtb.ru", "raiffeisen.ru", "gazprombank.ru"),
+    "email": ("gmail.com", "mail.ru", "yandex.ru", "outlook.com", "yahoo.com", "rambler.ru"),
+    "government": ("gov.ru", "gosuslugi.ru", "nalog.ru", "pfr.gov.ru", "mkgu.mos.ru"),
+    "search": ("google.com", "yandex.ru", "bing.com", "duckduckgo.com"),
+}
 
 class ContextAnalyzer(IContextAnalyzer):
-    def __init__(self, pattern_matcher: IPatternMatcher):
+    def __init__(self, pattern_matcher: IPatternMatcher, cache_size: int = 512):
         self.pattern_matcher = pattern_matcher
+        
+        # LRU-кэш результатов анализа: ключ -> поля, добавленные анализом
+        self.cache_size = cache_size
+        self._analysis_cache: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
         self.keyword_patterns = self._load_keyword_patterns()
         self.domain_categories = self._load_domain_categories()
+        self.page_type_keywords = self._load_page_type_keywords()
+        
+        # Одна скомпилированная альтернатива на категорию;
+        # текст и URL приводятся к нижнему регистру один раз в analyze()
+        self._keyword_regexes = self._compile_keywords(self.keyword_patterns)
+        self._page_type_regexes = self._compile_keywords(self.page_type_keywords)
+        
+        # Автомат Ахо-Корасик: все типы страниц за один проход по URL
+        self._page_type_automaton = None
+        if AHOCORASICK_AVAILABLE:
+            # Слово может относиться к нескольким типам ("account" - login и settings):
+            # add_word заменяет значение, поэтому храним все категории слова
+            owners: Dict[str, List[str]] = {}
+            for category, words in self.page_type_keywords.items():
+                for word in words:
+                    owners.setdefault(word.lower(), []).append(category)
+            automaton = ahocorasick.Automaton()
+            for word, categories in owners.items():
+                automaton.add_word(word, tuple(categories))
+            automaton.make_automaton()
+            self._page_type_automaton = automaton
+        
+        # Обратный индекс: суффикс домена -> категория (первая категория в приоритете)
+        self._domain_suffix_map: Dict[str, str] = {}
+        for category, domains in self.domain_categories.items():
+            for domain_pattern in domains:
+                self._domain_suffix_map.setdefault(domain_pattern.lower(), category)
     
-    def _load_keyword_patterns(self) -> Dict[str, List[str]]:
-        """Загрузить ключевые слова для анализа."""
+    @staticmethod
+    def _compile_keywords(keywords: Dict[str, List[str]]) -> Dict[str, Pattern]:
+        """Скомпилировать ключевые слова каждой категории в один regex (для текста в нижнем регистре)."""
         return {
-            "payment": ["купить", "оплатить", "цена", "стоимость", "чек", "checkout", "buy", "purchase", "cart", "корзин", "оплат"],
-            "login": ["войти", "вход", "логин", "sign in", "log in", "авторизация", "account", "аккаунт"],
-            "registration": ["регистрация", "зарегистрироваться", "sign up", "register", "создать аккаунт"],
-            "social": ["пост", "публикация", "поделиться", "share", "comment", "комментарий", "like", "лайк", "репост"],
-            "delete": ["удалить", "удаление", "стереть", "очистить", "delete", "remove", "clear", "отменить", "отмена"],
-            "download": ["скачать", "загрузить", "download", "upload", "файл", "документ"],
-            "legal": ["соглашение", "условия", "правила", "terms", "agreement", "policy", "политика"],
-            "contact": ["контакты", "обратная связь", "contact", "support", "поддержка"],
-            "search": ["поиск", "найти", "search", "find", "искать"],
-            "navigation": ["главная", "home", "назад", "back", "вперед", "forward", "меню", "menu"],
-            "settings": ["настройки", "settings", "профиль", "profile", "аккаунт", "account"],
+            category: re.compile("|".join(re.escape(word.lower()) for word in words))
+            for category, words in keywords.items()
         }
     
+    def _load_keyword_patterns(self) -> Dict[str, List[str]]:
+        """Загрузить ключевые слова для анализа."""
+        return {category: list(words) for category, words in _KEYWORD_PATTERNS.items()}
+    
+    def _load_page_type_keywords(self) -> Dict[str, List[str]]:
+        """Ключевые слова в URL для определения типа страницы."""
+        return {category: list(words) for category, words in _PAGE_TYPE_KEYWORDS.items()}
+    
     def _load_domain_categories(self) -> Dict[str, List[str]]:
         """Категории доменов для анализа."""
-        return {
-            "social": ["facebook.com", "twitter.com", "instagram.com", "vk.com", "tiktok.com", "linkedin.com"],
-            "shopping": ["amazon.com", "aliexpress.com", "ebay.com", "wildberries.ru", "ozon.ru", "yandex.market"],
-            "banking": ["sberbank.ru", "tinkoff.ru", "alfabank.ru", "vtb.ru", "raiffeisen.ru", "gazprombank.ru"],
-            "email": ["gmail.com", "mail.ru", "yandex.ru", "outlook.com", "yahoo.com", "rambler.ru"],
-            "government": ["gov.ru", "gosuslugi.ru", "nalog.ru", "pfr.gov.ru", "mkgu.mos.ru"],
-            "search": ["google.com", "yandex.ru", "bing.com", "duckduckgo.com"],
-        }
+        return {category: list(words) for category, words in _DOMAIN_CATEGORIES.items()}
     
     async def analyze(self, action_type: ActionType, target: str, 
                      raw_context: Dict[str, Any]) -> Dict[str, Any]:
         """Проанализировать контекст действия."""
+        if len(target) > _CACHE_MAX_TARGET_LENGTH:
+            return await self._analyze_uncached(action_type, target, raw_context)
+        
+        cache_key = self._cache_key(action_type, target, raw_context)
+        derived = self._analysis_cache.get(cache_key)
+        
+        if derived is None:
+            context = await self._analyze_uncached(action_type, target, raw_context)
+            
+            # Кэшируем только поля, которые добавил или изменил анализ;
+            # вложенные результаты (pattern_analysis, detected_patterns) копируются
+            # целиком, чтобы изменения у вызывающего не портили кэш
+            derived = deepcopy({
+                key: value for key, value in context.items()
+                if key not in raw_context or raw_context[key] is not value
+            })
+            self._analysis_cache[cache_key] = derived
+            if len(self._analysis_cache) > self.cache_size:
+                self._analysis_cache.popitem(last=False)
+            return context
+        
+        self._analysis_cache.move_to_end(cache_key)
+        context = raw_context.copy()
+        context.update(deepcopy(derived))
+        return context
+    
+    @staticmethod
+    def _cache_key(action_type: ActionType, target: str, raw_context: Dict[str, Any]) -> Hashable:
+        """Ключ кэша из всех полей сырого контекста, которые читает анализ."""
+        history = raw_context.get("recent_history")
+        history_key = None
+        if history is not None:
+            history_key = tuple(
+                (h.get("action_type", ""), str(h.get("target", ""))) for h in history[-5:]
+            )
+        return (
+            action_type,
+            target,
+            raw_context.get("current_url", ""),
+            raw_context.get("target_url"),
+            history_key,
+        )
+    
+    async def _analyze_uncached(self, action_type: ActionType, target: str,
+                                raw_context: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполнить полный анализ контекста без кэша."""
         context = raw_context.copy()
         
-        # 1. Анализ паттернов в тексте
-        pattern_analysis = await self.pattern_matcher.extract_sensitive_data(target)
+        # 1. Анализ паттернов в тексте (только категории, значимые для действия)
+        pattern_analysis = await self.pattern_matcher.extract_sensitive_data(
+            target, categories_for(action_type)
+        )
+        detected_patterns = pattern_analysis.get("patterns", {})
+        pattern_count = count_patterns(detected_patterns)
         context.update({
             "pattern_analysis": pattern_analysis,
-            "detected_patterns": pattern_analysis.get("patterns", {}),
+            "detected_patterns": detected_patterns,
         })
         
         # 2. Определение типа страницы
         current_url = context.get("current_url", "")
         if current_url:
-            page_analysis = self._analyze_page_type(current_url)
+            page_analysis = self._analyze_page_type(current_url.lower())
             context.update(page_analysis)
         
         # 3. Анализ домена
@@ -69,7 +205,7 @@ class ContextAnalyzer(IContextAnalyzer):
                 context.update(url_analysis)
         
         # 5. Анализ ключевых слов
-        keyword_analysis = self._analyze_keywords(target)
+        keyword_analysis = self._analyze_keywords(target.lower() if target else "")
         context.update(keyword_analysis)
         
         # 6. Анализ последовательности действий
@@ -84,29 +220,28 @@ class ContextAnalyzer(IContextAnalyzer):
         context.update(action_context_analysis)
         
         # 8. Расчет уверенности
-        context["confidence"] = self._calculate_confidence(context)
+        context["confidence"] = self._calculate_confidence(context, pattern_count)
         
         # 9. Генерация рекомендаций
         context["recommendations"] = self._generate_recommendations(context)
         
         return context
     
-    def _analyze_page_type(self, url: str) -> Dict[str, bool]:
-        """Определить тип страницы по URL."""
-        if not url:
+    def _analyze_page_type(self, url_lower: str) -> Dict[str, bool]:
+        """Определить тип страницы по URL (уже в нижнем регистре)."""
+        if not url_lower:
             return {}
         
-        url_lower = url.lower()
+        if self._page_type_automaton is not None:
+            result = {f"is_{category}_page": False for category in self.page_type_keywords}
+            for _, categories in self._page_type_automaton.iter(url_lower):
+                for category in categories:
+                    result[f"is_{category}_page"] = True
+            return result
         
         return {
-            "is_login_page": any(word in url_lower for word in ["login", "signin", "auth", "вход", "войти", "account"]),
-            "is_payment_page": any(word in url_lower for word in ["checkout", "payment", "pay", "cart", "корзин", "оплат", "order"]),
-            "is_registration_page": any(word in url_lower for word in ["register", "signup", "регистрация", "create.account"]),
-            "is_settings_page": any(word in url_lower for word in ["settings", "настройки", "profile", "профиль", "account"]),
-            "is_admin_page": any(word in url_lower for word in ["admin", "админ", "dashboard", "панель", "control"]),
-            "is_social_page": any(word in url_lower for word in ["facebook", "twitter", "vk", "instagram", "tiktok", "social"]),
-            "is_search_page": any(word in url_lower for word in ["search", "поиск", "google", "yandex", "bing"]),
-            "is_email_page": any(word in url_lower for word in ["mail", "email", "почта", "gmail", "outlook"]),
+            f"is_{category}_page": bool(regex.search(url_lower))
+            for category, regex in self._page_type_regexes.items()
         }
     
     def _analyze_domain(self, url: str) -> Dict[str, Any]:
@@ -117,14 +252,13 @@ class ContextAnalyzer(IContextAnalyzer):
         
         domain_lower = domain.lower()
         
-        # Определяем категорию домена
+        # Определяем категорию домена: проверяем суффиксы, отбрасывая метки слева
         domain_category = "other"
-        for category, domains in self.domain_categories.items():
-            for domain_pattern in domains:
-                if domain_lower.endswith(domain_pattern.lower()):
-                    domain_category = category
-                    break
-            if domain_category != "other":
+        labels = domain_lower.split(".")
+        for i in range(len(labels)):
+            category = self._domain_suffix_map.get(".".join(labels[i:]))
+            if category:
+                domain_category = category
                 break
         
         return {
@@ -143,21 +277,16 @@ class ContextAnalyzer(IContextAnalyzer):
             "is_suspicious_url": is_suspicious_domain(extract_domain(target_url)),
         }
     
-    def _analyze_keywords(self, text: str) -> Dict[str, bool]:
-        """Проанализировать ключевые слова."""
-        if not text:
+    def _analyze_keywords(self, text_lower: str) -> Dict[str, bool]:
+        """Проанализировать ключевые слова (текст уже в нижнем регистре)."""
+        if not text_lower:
             return {}
         
-        text_lower = text.lower()
-        result = {}
-        
-        for category, keywords in self.keyword_patterns.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    result[f"contains_{category}"] = True
-                    break
-        
-        return result
+        return {
+            f"contains_{category}": True
+            for category, regex in self._keyword_regexes.items()
+            if regex.search(text_lower)
+        }
     
     def _analyze_sequence(self, history: List[Dict], current_action: ActionType, target: str) -> Dict[str, Any]:
         """Проанализировать последовательность действий."""
@@ -171,26 +300,22 @@ class ContextAnalyzer(IContextAnalyzer):
         action_types = [h.get("action_type", "") for h in recent]
         targets = [str(h.get("target", "")).lower() for h in recent]
         
-        # Проверка паттернов поведения
-        is_login_flow = (
-            ActionType.TYPE_EMAIL.value in action_types and
-            ActionType.TYPE_PASSWORD.value in action_types
-        )
-        
-        is_payment_flow = (
-            any("payment" in t for t in targets) or
-            any("купить" in t for t in targets) or
-            any("оплатить" in t for t in targets)
-        )
-        
-        is_registration_flow = (
-            any("регистрация" in t for t in targets) or
-            any("register" in t for t in targets)
-        )
+        # Проверка паттернов поведения: один проход по последним действиям
+        is_payment_flow = is_registration_flow = False
+        type_count = 0
+        for action, t in zip(action_types, targets):
+            if action.startswith("TYPE_"):
+                type_count += 1
+            if not is_payment_flow and ("payment" in t or "купить" in t or "оплатить" in t):
+                is_payment_flow = True
+            if not is_registration_flow and ("регистрация" in t or "register" in t):
+                is_registration_flow = True
         
-        is_form_filling = (
-            len([a for a in action_types if a.startswith("TYPE_")]) >= 2
+        is_login_flow = (
+            _TYPE_EMAIL in action_types and
+            _TYPE_PASSWORD in action_types
         )
+        is_form_filling = type_count >= 2
         
         return {
             "is_login_flow": is_login_flow,
@@ -223,16 +348,13 @@ class ContextAnalyzer(IContextAnalyzer):
         
         return result
     
-    def _calculate_confidence(self, context: Dict[str, Any]) -> float:
-        """Рассчитать уверенность в анализе."""
+    def _calculate_confidence(self, context: Dict[str, Any], pattern_count: int) -> float:
+        """Рассчитать уверенность в анализе (pattern_count - число найденных паттернов)."""
         confidence_factors = []
         
         # Паттерны в тексте
         if context.get("detected_patterns"):
-            patterns = context["detected_patterns"]
-            total_patterns = sum(len(matches) for category in patterns.values() 
-                               for matches in category.values())
-            confidence_factors.append(min(total_patterns * 0.2, 1.0))
+            confidence_factors.append(min(pattern_count * 0.2, 1.0))
         
         # Контекстные признаки
         if context.get("is_login_page") and context.get("contains_login"):
@@ -256,19 +378,7 @@ class ContextAnalyzer(IContextAnalyzer):
     
     def _generate_recommendations(self, context: Dict[str, Any]) -> List[str]:
         """Сгенерировать рекомендации на основе контекста."""
-        recommendations = []
-        
-        if context.get("contains_passwords", False):
-            recommendations.append("🔐 Обнаружен ввод пароля - будьте осторожны")
-        
-        if context.get("contains_financial", False):
-            recommendations.append("💰 Обнаружены финансовые данные - проверьте безопасность")
-        
-        if context.get("is_external_domain", False):
-            recommendations.append("🌍 Переход на внешний домен - убедитесь в его надежности")
-        
-        if context.get("is_suspicious_domain", False):
-            recommendations.append("🚫 Подозрительный домен - рекомендуется отменить переход")
+        recommendations = [message for key, message in _RECS if context.get(key, False)]
         
         if not context.get("is_https", True) and context.get("contains_payment", False):
             recommendations.append("🔓 Оплата через HTTP - небезопасно, используйте HTTPS")
@@ -1,18 +1,33 @@
 """
 Контракты/интерфейсы для системы безопасности.
 """
-from typing import Protocol, Dict, Any, List, Optional, Tuple, Callable, Awaitable
+from typing import Protocol, Dict, Any, List, Optional, Tuple, Callable, Awaitable, Union, Mapping
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from abc import ABC, abstractmethod
 import asyncio
 
-class SecurityLevel(Enum):
+class _FastEnum(Enum):
+    """Перечисление с хешем по идентичности члена.
+    
+    Enum.__hash__ написан на Python и хеширует имя члена; члены - синглтоны,
+    поэтому хеш объекта эквивалентен и считается в C (ключи dict/set в горячих путях).
+    Строковые значения сохранены: они пишутся в журнал аудита и входят в хеш действия.
+    """
+    __hash__ = object.__hash__
+    
+    @property
+    def label(self) -> str:
+        """Строковое имя для интерфейса и сериализации."""
+        return self._value_
+
+class SecurityLevel(_FastEnum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
 
-class ActionType(Enum):
+class ActionType(_FastEnum):
+    # Значения - ключи весов риска, поэтому только в нижнем регистре
     CLICK = "click"
     CLICK_BUTTON = "click_button"
     CLICK_LINK = "click_link"
@@ -33,7 +48,21 @@ class ActionType(Enum):
     SCROLL = "scroll"
     ANALYZE = "analyze"
 
-@dataclass
+# Категории паттернов, которые имеет смысл искать в цели действия.
+# Действия без записи сканируются по всем категориям ("all"): число найденных
+# паттернов любой категории входит в уверенность анализа, а через нее - в оценку
+# риска, поэтому сужать набор можно только там, где оценка от него не зависит.
+ACTION_PATTERN_MAP: Dict[ActionType, Tuple[str, ...]] = {
+    ActionType.ANALYZE: (),  # базовый вес 0: оценка риска всегда 0
+}
+
+def categories_for(action_type: ActionType) -> Union[str, Tuple[str, ...]]:
+    """Получить категории паттернов для типа действия."""
+    return ACTION_PATTERN_MAP.get(action_type, "all")
+
+# Неизменяемые объекты со слотами: создаются на каждое правило и событие,
+# поэтому без __dict__; изменённую копию получают через dataclasses.replace
+@dataclass(slots=True, frozen=True)
 class RiskAssessment:
     """Оценка риска действия."""
     score: float  # 0-100
@@ -42,7 +71,7 @@ class RiskAssessment:
     recommendations: List[str]
     confidence: float = 0.5
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SecurityRule:
     """Правило безопасности."""
     name: str
@@ -54,9 +83,9 @@ class SecurityRule:
     regex: bool = False
     condition: Optional[Callable[[Dict], bool]] = None
     weight: float = 1.0
-    context_keys: List[str] = None
+    context_keys: Tuple[str, ...] = field(default_factory=tuple)
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SecurityEvent:
     """Событие безопасности."""
     timestamp: str
@@ -82,7 +111,7 @@ class IRiskAssessor(Protocol):
         pass
     
     @abstractmethod
-    def get_risk_weights(self) -> Dict[str, Dict[str, float]]:
+    def get_risk_weights(self) -> Mapping[str, Mapping[str, float]]:
         """Получить веса рисков для конфигурации."""
         pass
 
@@ -93,13 +122,17 @@ class IPatternMatcher(Protocol):
     async def find_patterns(
         self, 
         text: str, 
-        pattern_type: str = "all"
+        pattern_type: Union[str, Tuple[str, ...]] = "all"
     ) -> Dict[str, Dict[str, List[str]]]:
         """Найти паттерны в тексте."""
         pass
     
     @abstractmethod
-    async def extract_sensitive_data(self, text: str) -> Dict[str, Any]:
+    async def extract_sensitive_data(
+        self,
+        text: str,
+        pattern_type: Union[str, Tuple[str, ...]] = "all"
+    ) -> Dict[str, Any]:
         """Извлечь чувствительные данные с контекстом."""
         pass
     
@@ -210,7 +243,7 @@ class IConfirmationRequester(Protocol):
         pass
     
     @abstractmethod
-    async def set_auto_confirm(self, action_hash: str) -> None:
+    async def set_auto_confirm(self, action_hash: int) -> None:
         """Установить автоподтверждение для действия."""
         pass
 
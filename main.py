@@ -8,6 +8,7 @@ import os
 import asyncio
 import signal
 import json
+import threading
 from datetime import datetime
 from typing import Dict, List, Any
 
@@ -66,6 +67,42 @@ class AIConsole:
             print('='*60)
 
 
+def _append_jsonl(filename: str, record: Dict[str, Any]) -> None:
+    """Дописать запись в файл JSON Lines (выполняется в отдельном потоке)"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+async def _ainput(prompt: str) -> str:
+    """input() без блокировки цикла событий.
+    
+    Читаем в daemon-потоке: пока пользователь думает, браузер и фоновые
+    задачи продолжают работать, а выход по Ctrl+C не ждет завершения ввода.
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    
+    def deliver(setter, value):
+        if not future.done():
+            setter(value)
+    
+    def reader():
+        try:
+            line = input(prompt)
+        except Exception as e:
+            outcome = (future.set_exception, e)
+        else:
+            outcome = (future.set_result, line)
+        try:
+            loop.call_soon_threadsafe(deliver, *outcome)
+        except RuntimeError:
+            pass  # цикл событий уже закрыт
+    
+    threading.Thread(target=reader, name="task-input", daemon=True).start()
+    return await future
+
+
 def handle_interrupt(signum, frame):
     """Обработчик прерывания"""
     print("\n\n⚠️  Прерывание...")
@@ -143,9 +180,17 @@ async def main():
         "Примеры: 'войди в gmail', 'найди новости про AI', 'зарегистрируйся на сайте'"
     )
     
+    # Фоновые записи логов задач: дожидаемся их перед выходом
+    pending_saves = set()
+    
+    def on_saved(task):
+        pending_saves.discard(task)
+        if not task.cancelled() and task.exception():
+            console.print(f"⚠️  Ошибка сохранения: {task.exception()}", style="yellow")
+    
     while True:
         print("\n" + "-" * 70)
-        command = input("\nВведите задачу (или 'выход' для завершения): ").strip()
+        command = (await _ainput("\nВведите задачу (или 'выход' для завершения): ")).strip()
         
         if command.lower() in ['выход', 'exit', 'quit', 'q']:
             console.print("👋 Завершение работы...")
@@ -168,7 +213,6 @@ async def main():
             
             # Сохраняем результат
             try:
-                os.makedirs("logs", exist_ok=True)
                 task_record = {
                     "timestamp": datetime.now().isoformat(),
                     "task": command,
@@ -177,18 +221,13 @@ async def main():
                     "steps": len(agent.history)
                 }
                 
-                filename = f"logs/tasks_{datetime.now().strftime('%Y%m%d')}.json"
-                if os.path.exists(filename):
-                    with open(filename, 'r', encoding='utf-8') as f:
-                        existing_data = json.load(f)
-                    existing_data.append(task_record)
-                else:
-                    existing_data = [task_record]
+                # JSON Lines: одна запись на строку; запись файла не блокирует цикл событий
+                filename = f"logs/tasks_{datetime.now().strftime('%Y%m%d')}.jsonl"
+                save_task = asyncio.create_task(asyncio.to_thread(_append_jsonl, filename, task_record))
+                pending_saves.add(save_task)
+                save_task.add_done_callback(on_saved)
                 
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(existing_data, f, ensure_ascii=False, indent=2)
-                
-                console.print(f"📁 Результат сохранен в {filename}", style="dim")
+                console.print(f"📁 Результат сохраняется в {filename}", style="dim")
             except Exception as e:
                 console.print(f"⚠️  Ошибка сохранения: {e}", style="yellow")
         
@@ -200,6 +239,9 @@ async def main():
             traceback.print_exc()
     
     # Завершение работы
+    if pending_saves:
+        await asyncio.gather(*pending_saves, return_exceptions=True)
+    
     console.print("\n👋 Закрытие браузера...")
     await browser.close()
     
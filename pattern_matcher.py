@@ -2,14 +2,256 @@
 Поиск паттернов в тексте.
 """
 import re
-from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Pattern, Match, Set, Tuple, Callable, Union, Iterator
 from security.interfaces import IPatternMatcher
-from security.utils import mask_sensitive_data
+from security.utils import mask_sensitive_data, count_patterns, is_luhn_valid, is_inn_valid, fold_case
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Флаги паттернов (Unicode-семантика для str-паттернов включена по умолчанию)
+_PATTERN_FLAGS = re.IGNORECASE
+
+# Паттерны, которые компилируются без IGNORECASE: из цифр и разделителей или
+# с явными диапазонами обоих регистров (без свертки регистра re идет по быстрому
+# пути), а также регистрозависимые
+_CASE_NEUTRAL: frozenset = frozenset({
+    ("personal_data", "email"),
+    ("personal_data", "phone_ru"),
+    ("personal_data", "phone_international"),
+    ("personal_data", "passport"),
+    ("personal_data", "inn"),
+    ("personal_data", "snils"),
+    ("financial_data", "card_number"),
+    ("financial_data", "cvv"),
+    ("financial_data", "expiry_date"),
+    ("financial_data", "bank_account"),
+    # SWIFT/BIC пишется заглавными: с IGNORECASE под него попадает любое
+    # слово из 8 или 11 букв ("password", "phishing")
+    ("financial_data", "swift"),
+    ("url_patterns", "ip_address"),
+    ("url_patterns", "local_path"),
+})
+
+# Класс символов, хотя бы один из которых обязателен в совпадении паттерна:
+# поиск одного символа намного дешевле полного regex
+_REQUIRED_CHARS: Dict[Tuple[str, str], str] = {
+    ("personal_data", "email"): "@",
+    ("personal_data", "phone_international"): r"\+",
+    ("url_patterns", "http"): ":",
+    ("url_patterns", "https"): ":",
+    ("url_patterns", "local_path"): r"[:/]",
+    ("dangerous_patterns", "xss"): r"[<=]",
+}
+
+# Минимальная длина непрерывной последовательности цифр в любом совпадении.
+# Самая длинная серия цифр считается один раз за проход.
+_MIN_DIGIT_RUN: Dict[Tuple[str, str], int] = {
+    ("personal_data", "phone_ru"): 3,
+    ("personal_data", "passport"): 6,
+    ("personal_data", "inn"): 10,
+    ("personal_data", "snils"): 3,
+    ("financial_data", "card_number"): 4,
+    ("financial_data", "cvv"): 3,
+    ("financial_data", "expiry_date"): 2,
+    ("financial_data", "iban"): 2,
+    ("financial_data", "bank_account"): 20,
+    ("financial_data", "amount"): 2,
+    ("url_patterns", "ip_address"): 1,
+}
+_DIGIT_RUN_RE = re.compile(r"\d+")
+
+# Слово для подсчета: считаем потоком, не строя список токенов
+_WORD_RE = re.compile(r"\S+")
+
+# Проверка контрольных сумм: отбрасывает совпадения, которые только похожи на номер
+_VALIDATORS: Dict[Tuple[str, str], Callable[[str], bool]] = {
+    ("financial_data", "card_number"): is_luhn_valid,
+    ("personal_data", "inn"): is_inn_valid,
+}
+
+# Паттерны контактных данных
+_CONTACT_PATTERNS = frozenset({"email", "phone_ru", "phone_international"})
+
+# Вклад признаков текста в уверенность (в порядке суммирования)
+_CONFIDENCE_WEIGHTS = (
+    ("contains_passwords", 0.9),
+    ("contains_financial", 0.8),
+    ("contains_dangerous", 0.95),
+)
+
+# Тексты длиннее порога сканируются вне цикла событий
+_OFFLOAD_MIN_LENGTH = 20000
+_SCAN_EXEC = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pattern-scan")
+
+# Тексты длиннее порога сканируются перекрывающимися окнами, чтобы рабочий
+# набор regex оставался в кэше процессора. Перекрытие заведомо длиннее
+# совпадений ограниченных паттернов; совпадение, дошедшее до зоны перекрытия,
+# перепроверяется поиском по всему тексту.
+_WINDOW_THRESHOLD = 256 * 1024
+_WINDOW_SIZE = 64 * 1024
+_WINDOW_OVERLAP = 1024
+
+
+def _iter_matches(pattern: Pattern, text: str) -> Iterator[Match]:
+    """Совпадения паттерна по порядку, как finditer; большие тексты - окнами."""
+    n = len(text)
+    if n <= _WINDOW_THRESHOLD:
+        yield from pattern.finditer(text)
+        return
+    
+    pos = 0
+    while pos < n:
+        end = min(pos + _WINDOW_SIZE, n)
+        safe_end = end - _WINDOW_OVERLAP if end < n else n
+        last = pos
+        for match in pattern.finditer(text, pos, end):
+            if match.end() > safe_end:
+                # Совпадение могло быть обрезано краем окна
+                match = pattern.search(text, last)
+                if match is None:
+                    return
+                yield match
+                pos = max(match.end(), match.start() + 1)
+                break
+            yield match
+            last = match.end()
+        else:
+            pos = max(last, safe_end)
+
+# Литералы (в нижнем регистре), хотя бы один из которых входит в любое
+# совпадение паттерна. Без них паттерн заведомо не сработает.
+_LITERAL_ANCHORS: Dict[Tuple[str, str], Tuple[str, ...]] = {
+    ("sensitive_keywords", "password"): ("пароль", "pwd", "pass", "ключ", "key", "pin", "код"),
+    ("sensitive_keywords", "secret"): ("секрет", "secret", "confidential", "private", "приватный", "конфиденциальный"),
+    ("sensitive_keywords", "security"): ("безопасность", "security", "auth", "token", "key"),
+    ("sensitive_keywords", "login"): ("логин", "login", "user", "account"),
+    ("sensitive_keywords", "authorization"): ("авторизация", "authorization", "авторизоваться", "authenticate"),
+    ("personal_data", "address"): ("ул.", "улица", "пр.", "проспект", "пер.", "переулок", "д.", "дом", "кв.", "квартира"),
+}
+
+# Литералы, хотя бы один из которых есть в любом совпадении категории.
+# Проверяются подстрочным поиском в C по свернутому тексту, без regex:
+# для обычного текста без опасных конструкций категория отсекается сразу.
+_CATEGORY_LITERALS: Dict[str, Tuple[str, ...]] = {
+    "dangerous_patterns": (
+        "<", "=", "javascript:", "eval(", "alert(", "document.cookie",
+        "union", "select", "insert", "delete", "drop",
+    ),
+}
 
 class PatternMatcher(IPatternMatcher):
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.patterns = self._load_patterns()
+        
+        # RE2 (линейное время, без катастрофического backtracking) включается явно:
+        # классы \b, \w, \d в RE2 только ASCII, поэтому он применяется лишь к ASCII-паттернам
+        self.use_re2 = RE2_AVAILABLE and bool(self.config.get("use_re2", False))
+        
+        # LRU-кэш результатов поиска: (тип паттернов, хеш текста) -> результат
+        self.cache_size = self.config.get("cache_size", 256)
+        self._results_cache: "OrderedDict[Tuple[str, bytes], Dict[str, Dict[str, List[str]]]]" = OrderedDict()
+        
+        # Объединенные regex категорий (строятся лениво)
+        self._category_gates: Dict[str, Optional[Pattern]] = {}
+        
+        # Автомат Ахо-Корасик по литералам: за один проход по тексту
+        # определяет, какие паттерны с литералами вообще стоит запускать
+        self._anchor_automaton = None
+        self._anchored: Set[Tuple[str, str]] = set()
+        if AHOCORASICK_AVAILABLE:
+            owners: Dict[str, List[Tuple[str, str]]] = {}
+            for key, words in _LITERAL_ANCHORS.items():
+                for word in words:
+                    owners.setdefault(word, []).append(key)
+            automaton = ahocorasick.Automaton()
+            for word, keys in owners.items():
+                automaton.add_word(word, tuple(keys))
+            automaton.make_automaton()
+            self._anchor_automaton = automaton
+            self._anchored = set(_LITERAL_ANCHORS)
+        
+        # Префильтр по обязательным символам
+        self._required: Dict[Tuple[str, str], Pattern] = {
+            key: re.compile(char_class) for key, char_class in _REQUIRED_CHARS.items()
+        }
+        self._min_digit_run: Dict[Tuple[str, str], int] = dict(_MIN_DIGIT_RUN)
+        self._validators: Dict[Tuple[str, str], Callable[[str], bool]] = dict(_VALIDATORS)
+        self._category_literals: Dict[str, Tuple[str, ...]] = dict(_CATEGORY_LITERALS)
+        
+        # База Hyperscan: какие паттерны вообще совпадают, за один проход (строится лениво)
+        self._hs_db = None
+        self._hs_ids: List[Tuple[str, str]] = []
+        self._hs_stale = HYPERSCAN_AVAILABLE
+        self._hs_lock = threading.Lock()
+        
+        self._case_neutral: Set[Tuple[str, str]] = set(_CASE_NEUTRAL)
+        
+        # Скомпилированные паттерны: компиляция один раз, а не при каждом поиске
+        self.compiled: Dict[str, Dict[str, Pattern]] = {}
+        for category, category_patterns in self.patterns.items():
+            for pattern_name, pattern in category_patterns.items():
+                self._compile_pattern(category, pattern_name, pattern)
+    
+    def _compile_pattern(self, category: str, name: str, pattern: str) -> None:
+        """Скомпилировать паттерн и сохранить его в self.compiled."""
+        case_neutral = (category, name) in self._case_neutral
+        
+        compiled = None
+        if self.use_re2 and pattern.isascii():
+            try:
+                compiled = re2.compile(pattern if case_neutral else f"(?i){pattern}")
+            except re2.error:
+                compiled = None
+        
+        if compiled is None:
+            try:
+                compiled = re.compile(pattern, 0 if case_neutral else _PATTERN_FLAGS)
+            except re.error as e:
+                print(f"Ошибка при компиляции паттерна {name}: {e}")
+                return
+        self.compiled.setdefault(category, {})[name] = compiled
+        self._category_gates.pop(category, None)
+        self._hs_stale = HYPERSCAN_AVAILABLE
+        self._results_cache.clear()
+    
+    def _category_gate(self, category: str) -> Optional[Pattern]:
+        """Объединенный regex категории: один проход отсеивает текст без совпадений.
+        
+        Альтернация находит совпадение тогда и только тогда, когда совпадает
+        хотя бы один из паттернов категории. Отдельные паттерны запускаются
+        только после срабатывания фильтра, поэтому пересекающиеся совпадения
+        разных паттернов сохраняются.
+        """
+        if category not in self._category_gates:
+            sources = [f"(?:{self.patterns[category][name]})" for name in self.compiled.get(category, {})]
+            try:
+                gate = re.compile("|".join(sources), _PATTERN_FLAGS) if sources else None
+            except re.error:
+                gate = None
+            self._category_gates[category] = gate
+        return self._category_gates[category]
     
     def _load_patterns(self) -> Dict[str, Dict[str, str]]:
         """Загрузить паттерны для анализа."""
@@ -22,7 +264,7 @@ class PatternMatcher(IPatternMatcher):
                 "inn": r'\b\d{10,12}\b',
                 "snils": r'\b\d{3}-\d{3}-\d{3} \d{2}\b',
                 "name": r'\b(?:[А-ЯЁ][а-яё]+(?:\s+[А-ЯЁ][а-яё]+){1,2}|[A-Z][a-z]+(?:\s+[A-Z][a-z]+){1,2})\b',
-                "address": r'\b(?:ул\.|улица|пр\.|проспект|пер\.|переулок|д\.|дом|кв\.|квартира)\b.*?\b\d+\b',
+                "address": r'\b(?:ул\.|улица|пр\.|проспект|пер\.|переулок|д\.|дом|кв\.|квартира)\b.{0,60}?\b\d+\b',
             },
             "financial_data": {
                 "card_number": r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
@@ -53,34 +295,178 @@ class PatternMatcher(IPatternMatcher):
             }
         }
     
-    async def find_patterns(self, text: str, pattern_type: str = "all") -> Dict[str, Dict[str, List[str]]]:
-        """Найти паттерны в тексте."""
+    def _build_hyperscan_db(self) -> None:
+        """Собрать базу Hyperscan из паттернов, которые он поддерживает.
+        
+        Флаг PREFILTER допускает лишние срабатывания, но не пропуски, поэтому
+        база служит фильтром: совпадения по-прежнему извлекает re.
+        Неподдерживаемые паттерны (например, с $ внутри) не фильтруются.
+        """
+        self._hs_stale = False
+        self._hs_db = None
+        self._hs_ids = []
+        
+        flags = (hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP |
+                 hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_PREFILTER)
+        expressions = []
+        for category, category_patterns in self.compiled.items():
+            for pattern_name in category_patterns:
+                expression = self.patterns[category][pattern_name].encode("utf-8")
+                try:
+                    hyperscan.Database().compile(expressions=[expression], flags=flags)
+                except hyperscan.error:
+                    continue
+                expressions.append(expression)
+                self._hs_ids.append((category, pattern_name))
+        
+        if not expressions:
+            return
+        db = hyperscan.Database()
+        try:
+            db.compile(expressions=expressions, ids=list(range(len(expressions))),
+                       elements=len(expressions), flags=[flags] * len(expressions))
+        except hyperscan.error as e:
+            print(f"Ошибка при сборке базы Hyperscan: {e}")
+            self._hs_ids = []
+            return
+        self._hs_db = db
+    
+    def _hyperscan_hits(self, data: Optional[bytes]) -> Optional[Set[Tuple[str, str]]]:
+        """Паттерны из базы Hyperscan, которые могут совпасть с текстом (UTF-8)."""
+        if self._hs_stale:
+            self._build_hyperscan_db()
+        if self._hs_db is None or data is None:
+            return None
+        
+        hit_ids: Set[int] = set()
+        with self._hs_lock:
+            self._hs_db.scan(data, match_event_handler=lambda pid, start, end, flags, ctx: hit_ids.add(pid))
+        return {self._hs_ids[pid] for pid in hit_ids}
+    
+    def _anchor_hits(self, text: str) -> Set[Tuple[str, str]]:
+        """Паттерны, литералы которых встречаются в тексте."""
+        hits: Set[Tuple[str, str]] = set()
+        for _, keys in self._anchor_automaton.iter(fold_case(text)):
+            hits.update(keys)
+        return hits
+    
+    async def find_patterns(self, text: str,
+                            pattern_type: Union[str, Tuple[str, ...]] = "all") -> Dict[str, Dict[str, List[str]]]:
+        """Найти паттерны в тексте (одна категория, кортеж категорий или "all")."""
         results = {}
         
         patterns_to_check = {}
         if pattern_type == "all":
-            patterns_to_check = self.patterns
-        elif pattern_type in self.patterns:
-            patterns_to_check = {pattern_type: self.patterns[pattern_type]}
+            patterns_to_check = self.compiled
+        elif isinstance(pattern_type, str):
+            if pattern_type not in self.compiled:
+                return results
+            patterns_to_check = {pattern_type: self.compiled[pattern_type]}
         else:
-            return results
+            patterns_to_check = {
+                category: self.compiled[category]
+                for category in pattern_type if category in self.compiled
+            }
+            if not patterns_to_check:
+                return results
+        
+        # Кодируем текст один раз: для ключа кэша и для Hyperscan
+        try:
+            data = text.encode("utf-8")
+        except UnicodeEncodeError:
+            # Одиночные суррогаты: некорректный UTF-8 в Hyperscan не передаем
+            data = None
+        
+        # Страницы часто сканируются повторно между шагами агента
+        digest_source = data if data is not None else text.encode("utf-8", "surrogatepass")
+        cache_key = (pattern_type, hashlib.blake2b(digest_source, digest_size=16).digest())
+        cached = self._results_cache.get(cache_key)
+        if cached is not None:
+            self._results_cache.move_to_end(cache_key)
+        else:
+            cached = await self._find_patterns_uncached(text, data, patterns_to_check)
+            self._results_cache[cache_key] = cached
+            if len(self._results_cache) > self.cache_size:
+                self._results_cache.popitem(last=False)
+        
+        # Копия, чтобы вызывающий код не испортил закэшированный результат
+        return {
+            category: {name: list(matches) for name, matches in category_results.items()}
+            for category, category_results in cached.items()
+        }
+    
+    async def _find_patterns_uncached(self, text: str, data: Optional[bytes],
+                                      patterns_to_check: Dict[str, Dict[str, Pattern]]) -> Dict[str, Dict[str, List[str]]]:
+        """Найти паттерны без кэша."""
+        if len(text) < _OFFLOAD_MIN_LENGTH:
+            return self._scan(text, data, patterns_to_check)
+        
+        # Ленивые структуры собираем здесь, чтобы поток сканирования только читал их
+        if self._hs_stale:
+            self._build_hyperscan_db()
+        if self._hs_db is None:
+            for category in patterns_to_check:
+                self._category_gate(category)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_SCAN_EXEC, self._scan, text, data, patterns_to_check)
+    
+    def _scan(self, text: str, data: Optional[bytes],
+              patterns_to_check: Dict[str, Dict[str, Pattern]]) -> Dict[str, Dict[str, List[str]]]:
+        """Синхронный поиск паттернов выбранных категорий."""
+        results = {}
+        anchor_hits = None
+        char_hits: Dict[Pattern, bool] = {}
+        longest_digit_run = None
+        folded = None
+        hs_hits = self._hyperscan_hits(data) if HYPERSCAN_AVAILABLE else None
+        hs_covered = set(self._hs_ids) if hs_hits is not None else ()
         
         for category, category_patterns in patterns_to_check.items():
+            literals = self._category_literals.get(category)
+            if literals is not None:
+                if folded is None:
+                    folded = fold_case(text)
+                if not any(literal in folded for literal in literals):
+                    continue
+            
+            if hs_hits is None:
+                gate = self._category_gate(category)
+                if gate is not None and not gate.search(text):
+                    continue
+            
             category_results = {}
             for pattern_name, pattern in category_patterns.items():
+                key = (category, pattern_name)
+                if key in hs_covered:
+                    if key not in hs_hits:
+                        continue
+                elif key in self._min_digit_run:
+                    if longest_digit_run is None:
+                        longest_digit_run = max(map(len, _DIGIT_RUN_RE.findall(text)), default=0)
+                    if longest_digit_run < self._min_digit_run[key]:
+                        continue
+                elif key in self._required:
+                    required = self._required[key]
+                    if required not in char_hits:
+                        char_hits[required] = required.search(text) is not None
+                    if not char_hits[required]:
+                        continue
+                elif key in self._anchored:
+                    if anchor_hits is None:
+                        anchor_hits = self._anchor_hits(text)
+                    if key not in anchor_hits:
+                        continue
+                
                 try:
-                    matches = re.findall(pattern, text, re.IGNORECASE | re.UNICODE)
-                    if matches:
-                        # Преобразуем в список строк (findall может возвращать tuple)
-                        matches_list = []
-                        for match in matches:
-                            if isinstance(match, tuple):
-                                matches_list.extend([m for m in match if m])
-                            elif match:
-                                matches_list.append(str(match))
-                        
-                        if matches_list:
-                            category_results[pattern_name] = matches_list
+                    # Совпадения целиком (а не группы), без повторов, в порядке появления
+                    unique = dict.fromkeys(m.group(0) for m in _iter_matches(pattern, text))
+                    unique.pop("", None)
+                    
+                    validator = self._validators.get(key)
+                    matches_list = [m for m in unique if validator(m)] if validator else list(unique)
+                    if matches_list:
+                        category_results[pattern_name] = matches_list
                 except Exception as e:
                     print(f"Ошибка при поиске паттерна {pattern_name}: {e}")
                     continue
@@ -90,14 +476,14 @@ class PatternMatcher(IPatternMatcher):
         
         return results
     
-    async def extract_sensitive_data(self, text: str) -> Dict[str, Any]:
+    async def extract_sensitive_data(self, text: str,
+                                     pattern_type: Union[str, Tuple[str, ...]] = "all") -> Dict[str, Any]:
         """Извлечь чувствительные данные с контекстом."""
-        results = await self.find_patterns(text, "all")
+        results = await self.find_patterns(text, pattern_type)
         
         # Статистика найденных паттернов
         stats = {
-            "total_patterns": sum(len(matches) for category in results.values() 
-                                for matches in category.values()),
+            "total_patterns": count_patterns(results),
             "has_personal_data": "personal_data" in results,
             "has_financial_data": "financial_data" in results,
             "has_sensitive_keywords": "sensitive_keywords" in results,
@@ -105,48 +491,18 @@ class PatternMatcher(IPatternMatcher):
         }
         
         # Анализ контекста
+        personal = results.get("personal_data", {})
         context_analysis = {
-            "contains_passwords": False,
-            "contains_financial": False,
-            "contains_contact_info": False,
-            "contains_personal_data": False,
-            "contains_dangerous": False,
+            "contains_passwords": "password" in results.get("sensitive_keywords", {}),
+            "contains_financial": "financial_data" in results,
+            "contains_contact_info": not _CONTACT_PATTERNS.isdisjoint(personal),
+            "contains_personal_data": "personal_data" in results,
+            "contains_dangerous": "dangerous_patterns" in results,
             "confidence": 0.0,
         }
         
-        # Анализ ключевых слов
-        if "sensitive_keywords" in results:
-            keywords = results["sensitive_keywords"]
-            if "password" in keywords:
-                context_analysis["contains_passwords"] = True
-        
-        # Анализ финансовых данных
-        if "financial_data" in results:
-            context_analysis["contains_financial"] = True
-        
-        # Анализ персональных данных
-        if "personal_data" in results:
-            personal = results["personal_data"]
-            if "email" in personal or "phone_ru" in personal or "phone_international" in personal:
-                context_analysis["contains_contact_info"] = True
-            context_analysis["contains_personal_data"] = True
-        
-        # Опасные паттерны
-        if "dangerous_patterns" in results:
-            context_analysis["contains_dangerous"] = True
-        
         # Рассчитываем уверенность
-        confidence_factors = []
-        
-        if context_analysis["contains_passwords"]:
-            confidence_factors.append(0.9)
-        
-        if context_analysis["contains_financial"]:
-            confidence_factors.append(0.8)
-        
-        if context_analysis["contains_dangerous"]:
-            confidence_factors.append(0.95)
-        
+        confidence_factors = [weight for flag, weight in _CONFIDENCE_WEIGHTS if context_analysis[flag]]
         if stats["total_patterns"] > 0:
             confidence_factors.append(min(stats["total_patterns"] * 0.2, 1.0))
         
@@ -161,7 +517,7 @@ class PatternMatcher(IPatternMatcher):
         # Метаданные
         metadata = {
             "text_length": len(text),
-            "word_count": len(text.split()),
+            "word_count": sum(1 for _ in _WORD_RE.finditer(text)),
             "has_urls": "url_patterns" in results,
             "extraction_time": "timestamp",
         }
@@ -184,6 +540,15 @@ class PatternMatcher(IPatternMatcher):
             self.patterns[category] = {}
         
         self.patterns[category][name] = pattern
+        
+        # Префильтры и флаги встроенного паттерна к пользовательскому не относятся
+        self._case_neutral.discard((category, name))
+        self._compile_pattern(category, name, pattern)
+        self._anchored.discard((category, name))
+        self._required.pop((category, name), None)
+        self._min_digit_run.pop((category, name), None)
+        self._validators.pop((category, name), None)
+        self._category_literals.pop(category, None)
     
     def remove_pattern(self, category: str, name: str) -> bool:
         """Удалить паттерн."""
@@ -194,5 +559,13 @@ class PatternMatcher(IPatternMatcher):
             if not self.patterns[category]:
                 del self.patterns[category]
             
+            compiled = self.compiled.get(category, {})
+            compiled.pop(name, None)
+            if not compiled:
+                self.compiled.pop(category, None)
+            self._category_gates.pop(category, None)
+            self._hs_stale = HYPERSCAN_AVAILABLE
+            self._results_cache.clear()
+            
             return True
         return False
\ No newline at end of file
@@ -1,13 +1,49 @@
 """
 Оценка рисков действий.
 """
-from typing import Dict, Any, List
+import math
+import sys
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
 from security.interfaces import IRiskAssessor, ActionType, RiskAssessment
+from security.utils import risk_level_for
+
+# Тексты рекомендаций
+_REC_CONFIRM = "⚠️ Требуется подтверждение пользователя"
+_REC_HTTP = "🔓 Действие выполняется по HTTP (небезопасно)"
+
+# Признак контекста -> рекомендация (в порядке вывода)
+_REC_STRINGS: Dict[str, str] = {
+    "contains_passwords": "🔐 Пароли никогда не должны храниться в логах",
+    "contains_financial": "💰 Финансовые операции требуют особого внимания",
+    "is_suspicious_domain": "🚫 Подозрительный домен, рекомендуется отмена",
+}
+_REC_KEYS = frozenset(_REC_STRINGS)
+
+# Контекстные модификаторы, которые учитываются при навигации
+_NAV_CONTEXT_KEYS = frozenset({"is_suspicious_domain", "is_http", "is_https"})
 
 class RiskAssessor(IRiskAssessor):
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or {}
-        self.risk_weights = self._load_risk_weights()
+        self._set_weights(self._load_risk_weights())
+    
+    def _set_weights(self, weights: Mapping[str, Mapping[str, float]]) -> None:
+        """Установить веса рисков как неизменяемое представление."""
+        # Ключи контекста интернируем: совпадающие ключи из контекста страницы
+        # сравниваются по идентичности, без посимвольного сравнения строк
+        context = {sys.intern(key): weight for key, weight in weights["context"].items()}
+        
+        # Веса только для чтения: get_risk_weights отдает их без копирования
+        self.risk_weights: Mapping[str, Mapping[str, float]] = MappingProxyType({
+            **{group: MappingProxyType(dict(values)) for group, values in weights.items()},
+            "context": MappingProxyType(context),
+        })
+        
+        # Ключи контекстных модификаторов и их порядок: пересечение с ключами
+        # контекста считается в C, а порядок сохраняет прежнюю последовательность умножения
+        self._context_keys = frozenset(context)
+        self._context_order = {key: i for i, key in enumerate(context)}
     
     def _load_risk_weights(self) -> Dict[str, Dict[str, float]]:
         """Загрузить веса рисков."""
@@ -86,31 +122,30 @@ class RiskAssessor(IRiskAssessor):
                          context: Dict[str, Any]) -> RiskAssessment:
         """Оценить риск действия."""
         
-        # Получаем ключ действия в нижнем регистре
-        action_key = action_type.value.lower()
+        # Ключ действия: значения ActionType уже в нижнем регистре
+        action_key = action_type.value
         
         # Базовый риск от типа действия
         base_risk = self.risk_weights["action_type"].get(
             action_key, 1.0  # Значение по умолчанию
         )
         
-        # Модификаторы от контекста
-        context_modifier = 1.0
-        triggered_rules = []
-        
         # Исключение для навигации - меньше контекстных модификаторов
         is_navigation = action_key in ["navigate", "navigate_external", "navigate_suspicious"]
         
-        for context_key, weight in self.risk_weights["context"].items():
-            if context.get(context_key, False):
-                # Для навигации применяем только основные модификаторы
-                if is_navigation:
-                    if context_key in ["is_suspicious_domain", "is_http", "is_https"]:
-                        context_modifier *= weight
-                        triggered_rules.append(f"context_{context_key}")
-                else:
-                    context_modifier *= weight
-                    triggered_rules.append(f"context_{context_key}")
+        # Модификаторы от контекста
+        active = self._context_keys & context.keys()
+        # Для навигации применяем только основные модификаторы
+        if is_navigation:
+            active &= _NAV_CONTEXT_KEYS
+        
+        context_weights = self.risk_weights["context"]
+        active_keys = [
+            key for key in sorted(active, key=self._context_order.__getitem__) if context[key]
+        ]
+        active_weights = [context_weights[key] for key in active_keys]
+        context_modifier = math.prod(active_weights) if active_weights else 1.0
+        triggered_rules = [f"context_{key}" for key in active_keys]
         
         # Модификатор от уверенности
         confidence = context.get("confidence", 0.5)
@@ -132,27 +167,17 @@ class RiskAssessor(IRiskAssessor):
             normalized_score = min(normalized_score, 25)  # Максимум low риск
         
         # Определяем уровень риска
-        if normalized_score >= 80:
-            risk_level = "critical"
-        elif normalized_score >= 60:
-            risk_level = "high"
-        elif normalized_score >= 30:
-            risk_level = "medium"
-        else:
-            risk_level = "low"
+        risk_level = risk_level_for(normalized_score)
         
         # Рекомендации
-        recommendations = []
-        if risk_level in ["high", "critical"]:
-            recommendations.append("⚠️ Требуется подтверждение пользователя")
-        if context.get("contains_passwords"):
-            recommendations.append("🔐 Пароли никогда не должны храниться в логах")
-        if context.get("contains_financial"):
-            recommendations.append("💰 Финансовые операции требуют особого внимания")
-        if context.get("is_suspicious_domain"):
-            recommendations.append("🚫 Подозрительный домен, рекомендуется отмена")
+        recommendations = [_REC_CONFIRM] if risk_level in ("high", "critical") else []
+        flagged = _REC_KEYS & context.keys()
+        if flagged:
+            recommendations.extend(
+                text for key, text in _REC_STRINGS.items() if key in flagged and context[key]
+            )
         if not context.get("is_https", True) and base_risk > 10:
-            recommendations.append("🔓 Действие выполняется по HTTP (небезопасно)")
+            recommendations.append(_REC_HTTP)
         
         return RiskAssessment(
             score=normalized_score,
@@ -162,6 +187,13 @@ class RiskAssessor(IRiskAssessor):
             confidence=confidence
         )
     
-    def get_risk_weights(self) -> Dict[str, Dict[str, float]]:
-        """Получить веса рисков для конфигурации."""
-        return self.risk_weights.copy()
\ No newline at end of file
+    def get_risk_weights(self) -> Mapping[str, Mapping[str, float]]:
+        """Получить веса рисков для конфигурации (только для чтения)."""
+        return self.risk_weights
+    
+    def update_weights(self, overrides: Mapping[str, Mapping[str, float]]) -> None:
+        """Обновить веса рисков (например, при перезагрузке конфигурации)."""
+        weights = {group: dict(values) for group, values in self.risk_weights.items()}
+        for group, values in overrides.items():
+            weights.setdefault(group, {}).update(values)
+        self._set_weights(weights)
\ No newline at end of file
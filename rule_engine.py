@@ -2,13 +2,135 @@
 Движок правил безопасности.
 """
 import re
-from typing import Dict, Any, List, Tuple, Optional, Callable
+import logging
+from typing import Dict, Any, List, Tuple, Optional, Callable, Pattern, Set
 from security.interfaces import IRuleEngine, ActionType, SecurityRule, RiskAssessment
+from security.utils import risk_level_for, fold_case
+
+# Обратные ссылки по номеру ломаются при объединении паттернов в одну альтернацию
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=")
+
+# Паттерн вида "^литерал" проверяется через startswith по приведенной к регистру цели
+_LITERAL_PREFIX_RE = re.compile(r"\^([^.^$*+?{}\[\]\\|()]+)")
+
+# Коды символов и inline-флаги: такой паттерн нельзя проверять по приведенной цели
+_CASE_SENSITIVE_RE = re.compile(r"\\[xu0-7]|\(\?[aiLmsux-]")
+
+# Объединенный regex типа действия, имя группы -> паттерн правила
+# и признак того, что в regex вошли все regex-паттерны этого типа
+FusedRegex = Tuple[Optional[Pattern], Dict[str, str], bool]
 
 class RuleEngine(IRuleEngine):
+    # Множитель веса правила по уровню риска
+    _RISK_MULT = {
+        "low": 0.3,
+        "medium": 0.6,
+        "high": 0.9,
+        "critical": 1.0
+    }
+    
     def __init__(self):
         self.rules: List[SecurityRule] = []
+        self._log = logging.getLogger(__name__)
+        
+        # Паттерны правил готовятся один раз при добавлении, а не при каждой проверке.
+        # SecurityRule неизменяем и без __dict__ (slots), поэтому подготовленные формы
+        # хранятся здесь по строке паттерна: одинаковые паттерны разных правил общие
+        self._compiled_patterns: Dict[str, Pattern] = {}
+        self._lowered_patterns: Dict[str, str] = {}
+        self._prefix_patterns: Dict[str, str] = {}
+        
+        # Паттерны в нижнем регистре компилируются без IGNORECASE и проверяются
+        # по цели, приведенной через fold_case, - без ветвлений по регистру в regex
+        self._folded_patterns: Set[str] = set()
+        
+        # Правила, применимые к типу действия (свои и универсальные, в исходном
+        # порядке), строятся лениво и сбрасываются при изменении правил
+        self._rules_by_action: Dict[ActionType, List[SecurityRule]] = {}
+        
+        # Regex-паттерны правил каждого типа действия, объединенные в одну
+        # альтернацию (строятся лениво, сбрасываются при изменении правил)
+        self._fused: Dict[ActionType, FusedRegex] = {}
+        
         self._load_default_rules()
+        for rule in self.rules:
+            self._prepare_rule(rule)
+    
+    def _prepare_rule(self, rule: SecurityRule) -> None:
+        """Скомпилировать regex правила или привести строковый паттерн к нижнему регистру.
+        
+        Паттерн, который уже записан в нижнем регистре, компилируется без
+        IGNORECASE; остальные (с заглавными буквами, \\S, \\W, кодами символов
+        или inline-флагами) сохраняют IGNORECASE и проверяются по исходной цели.
+        """
+        if not rule.pattern:
+            return
+        if rule.regex:
+            if rule.pattern not in self._compiled_patterns:
+                prefix = _LITERAL_PREFIX_RE.fullmatch(rule.pattern)
+                if prefix:
+                    self._prefix_patterns[rule.pattern] = fold_case(prefix.group(1))
+                if fold_case(rule.pattern) == rule.pattern and not _CASE_SENSITIVE_RE.search(rule.pattern):
+                    self._folded_patterns.add(rule.pattern)
+                    self._compiled_patterns[rule.pattern] = re.compile(rule.pattern)
+                else:
+                    self._compiled_patterns[rule.pattern] = re.compile(rule.pattern, re.IGNORECASE)
+        else:
+            self._lowered_patterns[rule.pattern] = rule.pattern.lower()
+    
+    def _applicable_rules(self, action_type: ActionType) -> List[SecurityRule]:
+        """Получить правила, которые проверяются для типа действия."""
+        rules = self._rules_by_action.get(action_type)
+        if rules is None:
+            rules = self._rules_by_action[action_type] = [
+                rule for rule in self.rules
+                if not rule.action_type or rule.action_type == action_type
+            ]
+        return rules
+    
+    def _fused_regex(self, action_type: ActionType) -> FusedRegex:
+        """Объединить regex-паттерны правил типа действия в одну альтернацию."""
+        fused = self._fused.get(action_type)
+        if fused is not None:
+            return fused
+        
+        sources: List[str] = []
+        complete = True
+        for rule in self._applicable_rules(action_type):
+            if not (rule.regex and rule.pattern) or rule.pattern in self._prefix_patterns:
+                continue
+            if _BACKREF_RE.search(rule.pattern) or rule.pattern not in self._folded_patterns:
+                complete = False
+            elif rule.pattern not in sources:
+                sources.append(rule.pattern)
+        
+        regex = None
+        groups = {f"_r{i}": source for i, source in enumerate(sources)}
+        if groups:
+            try:
+                regex = re.compile(
+                    "|".join(f"(?P<{name}>{source})" for name, source in groups.items())
+                )
+            except re.error:
+                groups, complete = {}, False
+        
+        fused = self._fused[action_type] = (regex, groups, complete)
+        return fused
+    
+    def _regex_hits(self, action_type: ActionType, target: str) -> Tuple[Set[str], bool]:
+        """Найти сработавшие regex-паттерны одним проходом по цели (после fold_case).
+        
+        Возвращает найденные паттерны и признак того, что остальные паттерны
+        тоже могут совпадать: альтернация находит непересекающиеся совпадения,
+        поэтому паттерн, перекрытый другим, приходится проверять отдельно.
+        Если ничего не найдено, ни один объединенный паттерн не совпадает.
+        """
+        regex, groups, complete = self._fused_regex(action_type)
+        if regex is None:
+            return set(), not complete
+        
+        found = {groups[m.lastgroup] for m in regex.finditer(target)}
+        return found, bool(found) or not complete
     
     def _load_default_rules(self):
         """Загрузить правила по умолчанию."""
@@ -102,30 +224,42 @@ class RuleEngine(IRuleEngine):
     async def evaluate_rules(self, action_type: ActionType, target: str,
                             context: Dict[str, Any]) -> Tuple[List[SecurityRule], RiskAssessment]:
         """Оценить действие по всем правилам."""
+        # Правила для навигации не проверяются, риск всегда low
+        if action_type in (ActionType.NAVIGATE, ActionType.NAVIGATE_EXTERNAL):
+            return [], RiskAssessment(
+                score=5,
+                level="low",
+                triggered_rules=[],
+                recommendations=[],
+                confidence=context.get("confidence", 0.5)
+            )
+        
         triggered_rules = []
+        rules = self._applicable_rules(action_type)
+        if rules:
+            target_lower = target.lower()
+            target_folded = fold_case(target)
+            regex_hits, check_rest = self._regex_hits(action_type, target_folded)
         
-        for rule in self.rules:
-            #print(0)
-            # Проверяем, подходит ли правило для данного типа действия
-            if rule.action_type and rule.action_type != action_type:
-                continue
-            #print(1)
-            # Пропускаем правила для навигации
-            if action_type in [ActionType.NAVIGATE, ActionType.NAVIGATE_EXTERNAL]:
-                continue
-            #print(2)
+        for rule in rules:
             # Проверяем дополнительные условия
             if rule.condition and not rule.condition(context):
                 continue
-            #print(3)
             # Проверяем соответствие паттерну
             if rule.pattern:
                 if rule.regex:
-                    if re.search(rule.pattern, target, re.IGNORECASE):
-                        triggered_rules.append(rule)
+                    prefix = self._prefix_patterns.get(rule.pattern)
+                    if prefix is not None:
+                        matched = target_folded.startswith(prefix)
+                    else:
+                        text = target_folded if rule.pattern in self._folded_patterns else target
+                        matched = rule.pattern in regex_hits or bool(
+                            check_rest and self._compiled_patterns[rule.pattern].search(text)
+                        )
                 else:
-                    if rule.pattern.lower() in target.lower():
-                        triggered_rules.append(rule)
+                    matched = self._lowered_patterns[rule.pattern] in target_lower
+                if matched:
+                    triggered_rules.append(rule)
             elif rule.condition:
                 # Правило только с условием
                 triggered_rules.append(rule)
@@ -133,15 +267,10 @@ class RuleEngine(IRuleEngine):
         # Оцениваем риск на основе сработавших правил
         risk_score = 0.0
         max_possible = 0.0
-        print(triggered_rules)
+        self._log.debug("Сработавшие правила: %s", triggered_rules)
         for rule in triggered_rules:
             weight = rule.weight
-            risk_level_multiplier = {
-                "low": 0.3,
-                "medium": 0.6,
-                "high": 0.9,
-                "critical": 1.0
-            }.get(rule.risk_level, 0.5)
+            risk_level_multiplier = self._RISK_MULT.get(rule.risk_level, 0.5)
             
             risk_score += weight * risk_level_multiplier
             max_possible += weight
@@ -149,21 +278,8 @@ class RuleEngine(IRuleEngine):
         # Нормализуем оценку 0-100
         
         normalized_score = (risk_score / max_possible * 100) if max_possible > 0 else 0
-        #print(normalized_score, risk_score)
         # Определяем уровень
-        if normalized_score >= 80:
-            risk_level = "critical"
-        elif normalized_score >= 60:
-            risk_level = "high"
-        elif normalized_score >= 30:
-            risk_level = "medium"
-        else:
-            risk_level = "low"
-        
-        # Для навигации всегда low
-        if action_type in [ActionType.NAVIGATE, ActionType.NAVIGATE_EXTERNAL]:
-            normalized_score = 5
-            risk_level = "low"
+        risk_level = risk_level_for(normalized_score)
         
         risk_assessment = RiskAssessment(
             score=normalized_score,
@@ -177,11 +293,16 @@ class RuleEngine(IRuleEngine):
     
     def add_rule(self, rule: SecurityRule) -> None:
         """Добавить правило."""
+        self._prepare_rule(rule)
         self.rules.append(rule)
+        self._rules_by_action.clear()
+        self._fused.clear()
     
     def remove_rule(self, rule_name: str) -> None:
         """Удалить правило."""
         self.rules = [r for r in self.rules if r.name != rule_name]
+        self._rules_by_action.clear()
+        self._fused.clear()
     
     def get_rules_count(self) -> Dict[str, int]:
         """Получить статистику по правилам."""
@@ -1,9 +1,13 @@
 """
 Основной фасад для системы безопасности.
 """
-from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Deque, Dict, Any, List, Optional, Tuple, Callable, Awaitable
 from security.interfaces import (
-    ISecurityLayer, SecurityLevel, ActionType, SecurityEvent, RiskAssessment
+    ISecurityLayer, SecurityLevel, ActionType, SecurityEvent, RiskAssessment, SecurityRule
 )
 from security.utils import detect_action_type, generate_action_hash
 from security.pattern_matcher import PatternMatcher
@@ -13,9 +17,24 @@ from security.rule_engine import RuleEngine
 from security.audit_logger import AuditLogger
 from security.confirmation_requester import ConfirmationRequester
 
+# Сообщения журнала: аргументы подставляет logging, только если уровень включен
+_MSG_INIT = "🔒 Security Layer инициализирован с уровнем: %s"
+_MSG_PREVIOUSLY_CONFIRMED = "✅ Действие уже подтверждено ранее"
+_MSG_RISK_DETAILS = "🔍 Оценка риска для %s: правила %.1f (%s), риск-анализатор %.1f (%s), уверенность %.2f"
+_MSG_THRESHOLD_EXCEEDED = "⚠️ Риск превысил порог 20 (%.1f) - требуется подтверждение"
+_MSG_USER_BLOCKED = "❌ Действие отклонено пользователем: %s"
+_MSG_USER_APPROVED = "✅ Действие подтверждено пользователем: %s"
+_MSG_ALLOWED_DEFAULT = "✅ Действие разрешено (по умолчанию)"
+_MSG_ALLOWED_LEVEL = "✅ Действие разрешено (%s уровень безопасности)"
+_MSG_SUSPICIOUS_NAVIGATION = "🔒 Подозрительная навигация - требуется подтверждение"
+_MSG_AUTO_BLOCKED = "🚫 Опасное действие заблокировано автоматически (уровень риска: %s)"
+_MSG_MEDIUM_RISK = "🔒 Средний риск - требуется подтверждение"
+
 class SecurityLayer(ISecurityLayer):
-    def __init__(self, security_level: SecurityLevel = SecurityLevel.MEDIUM):
+    def __init__(self, security_level: SecurityLevel = SecurityLevel.MEDIUM,
+                 confirmed_actions_limit: int = 1024):
         self.security_level = security_level
+        self._log = logging.getLogger(__name__)
         
         # Инициализация компонентов
         self.pattern_matcher = PatternMatcher()
@@ -26,22 +45,34 @@ class SecurityLayer(ISecurityLayer):
         self.confirmation_requester = ConfirmationRequester()
         
         # История действий и подтверждений
-        self.action_history: List[Dict[str, Any]] = []
-        self.confirmed_actions = set()
+        # Последние 100 действий: старые записи вытесняются при добавлении
+        self.action_history: Deque[Dict[str, Any]] = deque(maxlen=100)
+        # Хеши действий, разрешенных "для всей сессии": LRU с ограниченным размером
+        self.confirmed_actions: "OrderedDict[int, None]" = OrderedDict()
+        self.confirmed_actions_limit = confirmed_actions_limit
         self.confirmation_callbacks: List[Callable[[SecurityEvent], Awaitable[None]]] = []
         
-        print(f"🔒 Security Layer инициализирован с уровнем: {security_level.value}")
+        # Обработчики действий с низким риском по уровню безопасности
+        self._level_handlers = {
+            SecurityLevel.LOW: self._handle_low,
+            SecurityLevel.MEDIUM: self._handle_medium,
+            SecurityLevel.HIGH: self._handle_high,
+        }
+        
+        self._log.info(_MSG_INIT, security_level.value)
+    
+    def _remember_confirmed(self, action_hash: int) -> None:
+        """Запомнить разрешенное действие, вытесняя самое давнее при переполнении."""
+        self.confirmed_actions[action_hash] = None
+        self.confirmed_actions.move_to_end(action_hash)
+        if len(self.confirmed_actions) > self.confirmed_actions_limit:
+            self.confirmed_actions.popitem(last=False)
     
     def _add_to_history(self, entry: Dict[str, Any]) -> None:
         """Добавить запись в историю."""
         # Добавляем timestamp
-        from datetime import datetime
         entry["timestamp"] = datetime.now().isoformat()
         self.action_history.append(entry)
-        
-        # Ограничиваем размер истории
-        if len(self.action_history) > 100:
-            self.action_history = self.action_history[-100:]
     
     async def check_action(self, action_type: ActionType, target: str,
                           context: Optional[Dict[str, Any]] = None) -> Tuple[bool, RiskAssessment]:
@@ -61,7 +92,8 @@ class SecurityLayer(ISecurityLayer):
         # 3. Проверяем, было ли это действие уже подтверждено
         action_hash = generate_action_hash(action_type, target, context)
         if action_hash in self.confirmed_actions:
-            print(f"   ✅ Действие уже подтверждено ранее")
+            self.confirmed_actions.move_to_end(action_hash)
+            self._log.debug(_MSG_PREVIOUSLY_CONFIRMED)
             return True, RiskAssessment(
                 score=0,
                 level="low",
@@ -70,26 +102,23 @@ class SecurityLayer(ISecurityLayer):
                 confidence=1.0
             )
         
-        # 4. Оценка по правилам
-        triggered_rules, rule_risk = await self.rule_engine.evaluate_rules(
-            action_type, target, context
-        )
-        
-        # 5. Оценка риска
-        risk_assessment = await self.risk_assessor.assess_risk(
-            action_type, target, context
+        # 4-5. Оценка по правилам и оценка риска (независимы друг от друга)
+        (triggered_rules, rule_risk), risk_assessment = await asyncio.gather(
+            self.rule_engine.evaluate_rules(action_type, target, context),
+            self.risk_assessor.assess_risk(action_type, target, context),
         )
         
         # 6. Отладочная информация
-        print(f"   🔍 Оценка риска для {action_type.value}:")
-        print(f"      - Правила: {rule_risk.score:.1f} ({rule_risk.level})")
-        print(f"      - Риск-анализатор: {risk_assessment.score:.1f} ({risk_assessment.level})")
-        print(f"      - Уверенность: {risk_assessment.confidence:.2f}")
+        self._log.debug(
+            _MSG_RISK_DETAILS,
+            action_type.value, rule_risk.score, rule_risk.level,
+            risk_assessment.score, risk_assessment.level, risk_assessment.confidence
+        )
         
         # Объединяем оценку рисков
         combined_score = max(rule_risk.score, risk_assessment.score)
         combined_level = rule_risk.level if rule_risk.score > risk_assessment.score else risk_assessment.level
-        combined_rules = list(set(rule_risk.triggered_rules + risk_assessment.triggered_rules))
+        combined_rules = list({*rule_risk.triggered_rules, *risk_assessment.triggered_rules})
         
         final_risk_assessment = RiskAssessment(
             score=combined_score,
@@ -101,119 +130,119 @@ class SecurityLayer(ISecurityLayer):
         
         # 7. НОВАЯ ЛОГИКА: Проверяем порог риска 20
         if final_risk_assessment.score > 20:
-            print(f"   ⚠️  Риск превысил порог 20 ({final_risk_assessment.score:.1f}) - требуется подтверждение")
+            self._log.info(_MSG_THRESHOLD_EXCEEDED, final_risk_assessment.score)
             
-            # Запрашиваем подтверждение у пользователя
-            allowed, reason = await self.confirmation_requester.request_confirmation(
-                action_type, target, final_risk_assessment, context, triggered_rules
+            allowed, reason = await self._confirm(
+                action_type, target, final_risk_assessment, triggered_rules, context, action_hash
             )
             
-            if allowed and reason == "approved_all":
-                self.confirmed_actions.add(action_hash)
-            
-            # Логируем результат
-            await self.audit_logger.log_action(
-                action_type, target, final_risk_assessment, allowed, context
-            )
+            if not allowed:
+                self._log.info(_MSG_USER_BLOCKED, reason)
+            else:
+                self._log.info(_MSG_USER_APPROVED, reason)
             
-            # Вызываем колбэки
+            return allowed, final_risk_assessment
+        
+        # 8. Если риск <= 20, проверяем по уровню безопасности
+        handler = self._level_handlers.get(self.security_level)
+        if handler is not None:
+            return await handler(action_type, target, final_risk_assessment, triggered_rules, context, action_hash)
+        
+        # По умолчанию разрешаем
+        self._log.debug(_MSG_ALLOWED_DEFAULT)
+        return True, final_risk_assessment
+    
+    async def _confirm(self, action_type: ActionType, target: str, risk_assessment: RiskAssessment,
+                       triggered_rules: List[SecurityRule], context: Dict[str, Any],
+                       action_hash: Optional[int], notify: bool = True) -> Tuple[bool, Optional[str]]:
+        """Запросить подтверждение, записать решение в аудит и уведомить колбэки.
+        
+        Решение "разрешить все" запоминается, только если передан action_hash.
+        Одновременные запросы объединяются в один групповой; без action_hash
+        действие подтверждается отдельно, так как групповой запрос запоминает
+        разрешенные "для всей сессии" действия.
+        """
+        request = (
+            self.confirmation_requester.enqueue_confirmation if action_hash is not None
+            else self.confirmation_requester.request_confirmation
+        )
+        allowed, reason = await request(action_type, target, risk_assessment, context, triggered_rules)
+        
+        if action_hash is not None and allowed and reason == "approved_all":
+            self._remember_confirmed(action_hash)
+        
+        # Логируем результат
+        await self.audit_logger.log_action(
+            action_type, target, risk_assessment, allowed, context
+        )
+        
+        # Вызываем колбэки
+        if notify:
             event = SecurityEvent(
                 timestamp=context.get("timestamp", ""),
                 action=action_type,
                 target=target,
-                risk_assessment=final_risk_assessment,
+                risk_assessment=risk_assessment,
                 context=context,
                 confirmed=allowed,
                 user_decision=reason,
-                confidence=final_risk_assessment.confidence
+                confidence=risk_assessment.confidence
             )
             await self._notify_callbacks(event)
-            
-            if not allowed:
-                print(f"   ❌ Действие отклонено пользователем: {reason}")
-            else:
-                print(f"   ✅ Действие подтверждено пользователем: {reason}")
-            
-            return allowed, final_risk_assessment
         
-        # 8. Если риск <= 20, проверяем по уровню безопасности
-        if self.security_level == SecurityLevel.LOW:
-            # НИЗКИЙ уровень: только логируем
-            await self.audit_logger.log_action(
-                action_type, target, final_risk_assessment, True, context
+        return allowed, reason
+    
+    async def _allow(self, action_type: ActionType, target: str, risk_assessment: RiskAssessment,
+                     context: Dict[str, Any], level_name: str) -> Tuple[bool, RiskAssessment]:
+        """Разрешить действие с записью в аудит."""
+        await self.audit_logger.log_action(
+            action_type, target, risk_assessment, True, context
+        )
+        self._log.debug(_MSG_ALLOWED_LEVEL, level_name)
+        return True, risk_assessment
+    
+    async def _handle_low(self, action_type: ActionType, target: str, risk_assessment: RiskAssessment,
+                          triggered_rules: List[SecurityRule], context: Dict[str, Any],
+                          action_hash: int) -> Tuple[bool, RiskAssessment]:
+        """НИЗКИЙ уровень: только логируем."""
+        return await self._allow(action_type, target, risk_assessment, context, "низкий")
+    
+    async def _handle_medium(self, action_type: ActionType, target: str, risk_assessment: RiskAssessment,
+                             triggered_rules: List[SecurityRule], context: Dict[str, Any],
+                             action_hash: int) -> Tuple[bool, RiskAssessment]:
+        """СРЕДНИЙ уровень: подтверждение для подозрительной навигации."""
+        if action_type == ActionType.NAVIGATE_SUSPICIOUS and risk_assessment.level in ["medium", "high", "critical"]:
+            self._log.info(_MSG_SUSPICIOUS_NAVIGATION)
+            allowed, _ = await self._confirm(
+                action_type, target, risk_assessment, triggered_rules, context, action_hash
             )
-            print(f"   ✅ Действие разрешено (низкий уровень безопасности)")
-            return True, final_risk_assessment
-        
-        elif self.security_level == SecurityLevel.MEDIUM:
-            # СРЕДНИЙ уровень: дополнительные проверки
-            # Для подозрительной навигации запрашиваем подтверждение
-            if action_type == ActionType.NAVIGATE_SUSPICIOUS and final_risk_assessment.level in ["medium", "high", "critical"]:
-                print(f"   🔒 Подозрительная навигация - требуется подтверждение")
-                allowed, reason = await self.confirmation_requester.request_confirmation(
-                    action_type, target, final_risk_assessment, context, triggered_rules
-                )
-                
-                if allowed and reason == "approved_all":
-                    self.confirmed_actions.add(action_hash)
-                
-                await self.audit_logger.log_action(
-                    action_type, target, final_risk_assessment, allowed, context
-                )
-                
-                event = SecurityEvent(
-                    timestamp=context.get("timestamp", ""),
-                    action=action_type,
-                    target=target,
-                    risk_assessment=final_risk_assessment,
-                    context=context,
-                    confirmed=allowed,
-                    user_decision=reason,
-                    confidence=final_risk_assessment.confidence
-                )
-                await self._notify_callbacks(event)
-                
-                return allowed, final_risk_assessment
-            
-            # Для остальных действий разрешаем
+            return allowed, risk_assessment
+        
+        # Для остальных действий разрешаем
+        return await self._allow(action_type, target, risk_assessment, context, "средний")
+    
+    async def _handle_high(self, action_type: ActionType, target: str, risk_assessment: RiskAssessment,
+                           triggered_rules: List[SecurityRule], context: Dict[str, Any],
+                           action_hash: int) -> Tuple[bool, RiskAssessment]:
+        """ВЫСОКИЙ уровень: строгие проверки."""
+        # Автоматически блокируем опасные действия
+        if risk_assessment.level in ["high", "critical"]:
+            self._log.info(_MSG_AUTO_BLOCKED, risk_assessment.level)
             await self.audit_logger.log_action(
-                action_type, target, final_risk_assessment, True, context
+                action_type, target, risk_assessment, False, context
             )
-            print(f"   ✅ Действие разрешено (средний уровень безопасности)")
-            return True, final_risk_assessment
-        
-        elif self.security_level == SecurityLevel.HIGH:
-            # ВЫСОКИЙ уровень: строгие проверки
-            # Автоматически блокируем опасные действия
-            if final_risk_assessment.level in ["high", "critical"]:
-                print(f"   🚫 Опасное действие заблокировано автоматически (уровень риска: {final_risk_assessment.level})")
-                await self.audit_logger.log_action(
-                    action_type, target, final_risk_assessment, False, context
-                )
-                return False, final_risk_assessment
-            
-            # Для среднего риска запрашиваем подтверждение
-            elif final_risk_assessment.level == "medium":
-                print(f"   🔒 Средний риск - требуется подтверждение")
-                allowed, reason = await self.confirmation_requester.request_confirmation(
-                    action_type, target, final_risk_assessment, context, triggered_rules
-                )
-                
-                await self.audit_logger.log_action(
-                    action_type, target, final_risk_assessment, allowed, context
-                )
-                return allowed, final_risk_assessment
-            
-            # Для низкого риска разрешаем
-            await self.audit_logger.log_action(
-                action_type, target, final_risk_assessment, True, context
+            return False, risk_assessment
+        
+        # Для среднего риска запрашиваем подтверждение (без запоминания и колбэков)
+        if risk_assessment.level == "medium":
+            self._log.info(_MSG_MEDIUM_RISK)
+            allowed, _ = await self._confirm(
+                action_type, target, risk_assessment, triggered_rules, context, None, notify=False
             )
-            print(f"   ✅ Действие разрешено (высокий уровень безопасности)")
-            return True, final_risk_assessment
+            return allowed, risk_assessment
         
-        # По умолчанию разрешаем
-        print(f"   ✅ Действие разрешено (по умолчанию)")
-        return True, final_risk_assessment
+        # Для низкого риска разрешаем
+        return await self._allow(action_type, target, risk_assessment, context, "высокий")
     
     async def register_confirmation_callback(self,
                                            callback: Callable[[SecurityEvent], Awaitable[None]]) -> None:
@@ -2,225 +2,510 @@
 Вспомогательные функции для безопасности.
 """
 import re
-import json
 import hashlib
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple, Callable
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Any, List, Optional, Set, Tuple, Callable, Awaitable, FrozenSet
 from urllib.parse import urlparse
-from datetime import datetime, timedelta
+import time
 from security.interfaces import ActionType, SecurityRule
 
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    from cachetools import TTLCache
+    CACHETOOLS_AVAILABLE = True
+except ImportError:
+    CACHETOOLS_AVAILABLE = False
+
+try:
+    import tldextract
+    TLDEXTRACT_AVAILABLE = True
+except ImportError:
+    TLDEXTRACT_AVAILABLE = False
+
+if TLDEXTRACT_AVAILABLE:
+    # Встроенный снимок Public Suffix List: без сетевых запросов и кэша на диске
+    _TLD_EXTRACTOR = tldextract.TLDExtract(cache_dir=None, suffix_list_urls=())
+
 # Кэш для хэшей действий (чтобы не генерировать каждый раз)
-_action_hash_cache = {}
-_cache_ttl = timedelta(minutes=10)
+# Время записей - time.monotonic() в секундах: не зависит от перевода часов
+_CACHE_TTL_S = 600.0
+_CACHE_MAX_SIZE = 10000
+if CACHETOOLS_AVAILABLE:
+    # TTLCache удаляет устаревшие записи сам, без полного обхода на каждой вставке
+    _action_hash_cache = TTLCache(maxsize=_CACHE_MAX_SIZE, ttl=_CACHE_TTL_S)
+else:
+    # Записи упорядочены по времени вставки: устаревшие всегда в начале
+    _action_hash_cache: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
 
-def detect_action_type(tool_name: str, args: Dict, context: Optional[Dict] = None) -> ActionType:
-    """Определить тип действия по названию инструмента и аргументам."""
-    from security.interfaces import ActionType
-    
-    context = context or {}
-    
-    # Извлекаем значения из args, убеждаясь, что это строки (не корутины)
-    def get_arg_value(arg_name: str, default: str = "") -> str:
-        value = args.get(arg_name, default)
-        # Если значение - корутина, пытаемся получить результат
-        if asyncio.iscoroutine(value):
-            try:
-                # Не можем вызвать await здесь, поэтому возвращаем пустую строку
-                return ""
-            except:
-                return ""
-        return str(value) if value is not None else ""
-    
-    if tool_name == "click_element":
-        target = get_arg_value("description", "").lower()
+# Очистка кэша раз в _SWEEP_INTERVAL вставок, а не на каждой
+_SWEEP_INTERVAL = 256
+_inserts_since_sweep = 0
+
+# Регулярные выражения компилируются один раз при импорте модуля
+_CARD_RE = re.compile(r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b')
+_CVV_RE = re.compile(r'\b(CVV|CVC)[:\s]*\d{3,4}\b', re.IGNORECASE)
+_PASSWORD_RE = re.compile(r'(пароль|password)[:\s]*[^\s]+', re.IGNORECASE)
+# Имя в email захватывается без возврата (possessive): за ним обязан идти '@',
+# которого нет в классе, поэтому результат тот же, а длинные строки вида
+# "a.a.a..." без '@' не перебираются повторно
+try:
+    _EMAIL_RE = re.compile(r'\b([A-Za-z0-9._%+-]++)@([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b')
+except re.error:
+    # Python < 3.11: possessive-квантификаторы не поддерживаются
+    _EMAIL_RE = re.compile(r'\b([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b')
+_PHONE_RE = re.compile(r'\b(\+7|8)[\s-]?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}\b')
+# Все маскируемые данные одним regex: если совпадений нет, текст не меняется
+# и пять отдельных замен не нужны. Email без '@' невозможен, поэтому он
+# проверяется по наличию '@', а не в общем regex
+_MASK_RE = re.compile("|".join(
+    f"(?P<{name}>(?i:{regex.pattern}))" if regex.flags & re.IGNORECASE else f"(?P<{name}>{regex.pattern})"
+    for name, regex in (("card", _CARD_RE), ("cvv", _CVV_RE), ("pwd", _PASSWORD_RE),
+                        ("phone", _PHONE_RE))
+))
+_PHONE_DIGITS_RE = re.compile(r'(\+7|8\d{10}|\d{11})')
+# Быстрая проверка наличия цифр перед regex телефона и карты: множество ASCII-цифр
+# проверяется в C, а \d для не-ASCII текста (цифры других алфавитов) - одним поиском
+_ASCII_DIGITS = frozenset('0123456789')
+_DIGIT_RE = re.compile(r'\d')
+
+def _has_digits(text: str) -> bool:
+    """Есть ли в тексте хотя бы одна цифра (в смысле \\d)."""
+    if not _ASCII_DIGITS.isdisjoint(text):
+        return True
+    return not text.isascii() and _DIGIT_RE.search(text) is not None
+
+_NON_WORD_RE = re.compile(r'[^a-zа-яё0-9\s]')
+# То же для ASCII-текста: str.translate проходит строку одним циклом в C
+_ASCII_SPECIAL_TABLE = str.maketrans({
+    chr(c): ' ' for c in range(128) if not (chr(c).isspace() or chr(c).isdigit() or 'a' <= chr(c) <= 'z')
+})
+
+def _strip_special(text: str) -> str:
+    """Заменить пробелами все, кроме строчных букв, цифр и пробельных символов."""
+    if text.isascii():
+        return text.translate(_ASCII_SPECIAL_TABLE)
+    return _NON_WORD_RE.sub(' ', text)
+# Подозрительный домен: TLD (последняя метка) или ключевое слово в любом месте
+_SUSPICIOUS_TLDS = frozenset({'tk', 'ml', 'ga', 'cf', 'gq', 'xyz', 'top', 'club'})
+_SUSPICIOUS_KEYWORDS_RE = re.compile(r'phishing|malware|scam|hack|exploit')
+
+# URL навигации проверяется без копии в нижнем регистре
+_HTTP_URL_RE = re.compile(r'http://', re.IGNORECASE)
+_SUSPICIOUS_URL_RE = re.compile(r'phishing|malware|scam|\.exe|\.zip|\.rar', re.IGNORECASE)
+
+# Ключевые слова ищутся как подстроки (основы вроде "корзин", "pass", ".com"),
+# поэтому множества задают только состав группы, а не пословное сравнение
+_PAYMENT_WORDS = frozenset({"купить", "оплатить", "заказ", "buy", "checkout", "cart", "корзин"})
+_DELETE_WORDS = frozenset({"удалить", "delete", "remove", "отменить", "cancel"})
+_SUBMIT_WORDS = frozenset({"отправить", "подтвердить", "submit", "save", "сохранить", "далее", "продолжить"})
+_SOCIAL_WORDS = frozenset({"пост", "share", "tweet", "comment", "лайк", "like"})
+_LEGAL_WORDS = frozenset({"принять", "согласиться", "agree", "terms", "условия"})
+_LINK_WORDS = frozenset({"http", "www", ".com", ".ru", "ссылка", "link"})
+_PASSWORD_WORDS = frozenset({"пароль", "password", "pwd", "pass", "ключ", "key", "pin"})
+_PERSONAL_WORDS = frozenset({"паспорт", "фио", "адрес", "город", "страна", "рождение", "снилс", "инн"})
+
+KeywordGroups = Tuple[Tuple[ActionType, FrozenSet[str]], ...]
+
+# Ключевые слова описания клика: категории в порядке приоритета
+_CLICK_KEYWORDS: KeywordGroups = (
+    (ActionType.PAYMENT, _PAYMENT_WORDS),
+    (ActionType.DELETE, _DELETE_WORDS),
+    (ActionType.FORM_SUBMIT, _SUBMIT_WORDS),
+    (ActionType.SOCIAL_ACTION, _SOCIAL_WORDS),
+    (ActionType.LEGAL_ACTION, _LEGAL_WORDS),
+    (ActionType.CLICK_LINK, _LINK_WORDS),
+)
+
+# Ключевые слова вводимого текста; между паролем и персональными данными
+# проверяются email, телефон и карта
+_TYPE_KEYWORDS: KeywordGroups = (
+    (ActionType.TYPE_PASSWORD, _PASSWORD_WORDS),
+    (ActionType.TYPE_PERSONAL, _PERSONAL_WORDS),
+)
+
+def _keyword_ranker(groups: KeywordGroups) -> Callable[[str], Optional[ActionType]]:
+    """Собрать поиск всех групп ключевых слов за один проход по тексту.
+    
+    Возвращает функцию, которая находит первую по приоритету группу,
+    хотя бы одно слово которой входит в текст (или None).
+    """
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for rank, (_, words) in enumerate(groups):
+            for word in words:
+                automaton.add_word(word, min(rank, automaton.get(word, rank)))
+        automaton.make_automaton()
         
-        # Определяем подтип клика
-        if any(word in target for word in ["купить", "оплатить", "заказ", "buy", "checkout", "cart", "корзин"]):
-            return ActionType.PAYMENT
-        elif any(word in target for word in ["удалить", "delete", "remove", "отменить", "cancel"]):
-            return ActionType.DELETE
-        elif any(word in target for word in ["отправить", "подтвердить", "submit", "save", "сохранить", "далее", "продолжить"]):
-            return ActionType.FORM_SUBMIT
-        elif any(word in target for word in ["пост", "share", "tweet", "comment", "лайк", "like"]):
-            return ActionType.SOCIAL_ACTION
-        elif any(word in target for word in ["принять", "согласиться", "agree", "terms", "условия"]):
-            return ActionType.LEGAL_ACTION
-        elif any(word in target for word in ["http", "www", ".com", ".ru", "ссылка", "link"]):
-            return ActionType.CLICK_LINK
-        else:
-            return ActionType.CLICK_BUTTON
-    
-    elif tool_name == "type_text":
-        text = get_arg_value("text", "").lower()
+        def first_group(text: str) -> Optional[ActionType]:
+            best = None
+            for _, rank in automaton.iter(text):
+                if best is None or rank < best:
+                    if rank == 0:
+                        return groups[0][0]
+                    best = rank
+            return None if best is None else groups[best][0]
+    else:
+        # Просмотр вперед находит слова, начинающиеся в каждой позиции, даже
+        # если они перекрываются; в одной позиции побеждает группа с меньшим номером
+        regex = re.compile("(?=" + "|".join(
+            f"(?P<_k{rank}>{'|'.join(map(re.escape, sorted(words)))})" for rank, (_, words) in enumerate(groups)
+        ) + ")")
         
-        # Определяем тип вводимых данных
-        if any(word in text for word in ["пароль", "password", "pwd", "pass", "ключ", "key", "pin"]):
-            return ActionType.TYPE_PASSWORD
-        elif "@" in text and "." in text and len(text) > 5:
-            return ActionType.TYPE_EMAIL
-        elif re.search(r'(\+7|8\d{10}|\d{11})', text):
-            return ActionType.TYPE_PHONE
-        elif re.search(r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b', text):
-            return ActionType.TYPE_CARD
-        elif any(word in text for word in ["паспорт", "фио", "адрес", "город", "страна", "рождение", "снилс", "инн"]):
-            return ActionType.TYPE_PERSONAL
-        elif context.get("is_login_page", False) and context.get("contains_passwords", False):
-            return ActionType.TYPE_PASSWORD
-        else:
-            return ActionType.TYPE
-    
-    elif tool_name == "navigate":
-        url = get_arg_value("url", "").lower()
-        if url.startswith("http://"):
-            return ActionType.NAVIGATE_SUSPICIOUS
-        elif any(word in url for word in ["phishing", "malware", "scam", ".exe", ".zip", ".rar"]):
-            return ActionType.NAVIGATE_SUSPICIOUS
-        else:
-            return ActionType.NAVIGATE
-    
-    elif tool_name == "scroll_down":
-        return ActionType.SCROLL
-    
-    elif tool_name == "analyze_page":
-        return ActionType.ANALYZE
+        def first_group(text: str) -> Optional[ActionType]:
+            best = None
+            for m in regex.finditer(text):
+                rank = int(m.lastgroup[2:])
+                if best is None or rank < best:
+                    if rank == 0:
+                        return groups[0][0]
+                    best = rank
+            return None if best is None else groups[best][0]
+    
+    return first_group
+
+_click_keyword_type = _keyword_ranker(_CLICK_KEYWORDS)
+_type_keyword_type = _keyword_ranker(_TYPE_KEYWORDS)
+
+def _arg_value(args: Dict, arg_name: str, default: str = "") -> str:
+    """Извлечь значение из args, убеждаясь, что это строка (не корутина)."""
+    value = args.get(arg_name, default)
+    if isinstance(value, str):
+        return value
+    # Корутину здесь не дождаться (нельзя вызвать await), поэтому пустая строка
+    if value is None or asyncio.iscoroutine(value):
+        return ""
+    return str(value)
+
+# Члены ActionType, которые возвращает detect_action_type: глобальное имя
+# вместо поиска атрибута в классе перечисления на каждом вызове
+_AT_ANALYZE = ActionType.ANALYZE
+_AT_CLICK = ActionType.CLICK
+_AT_CLICK_BUTTON = ActionType.CLICK_BUTTON
+_AT_NAVIGATE = ActionType.NAVIGATE
+_AT_NAVIGATE_SUSPICIOUS = ActionType.NAVIGATE_SUSPICIOUS
+_AT_SCROLL = ActionType.SCROLL
+_AT_TYPE = ActionType.TYPE
+_AT_TYPE_CARD = ActionType.TYPE_CARD
+_AT_TYPE_EMAIL = ActionType.TYPE_EMAIL
+_AT_TYPE_PASSWORD = ActionType.TYPE_PASSWORD
+_AT_TYPE_PERSONAL = ActionType.TYPE_PERSONAL
+_AT_TYPE_PHONE = ActionType.TYPE_PHONE
+
+def _detect_click(args: Dict, context: Dict) -> ActionType:
+    target = _arg_value(args, "description", "").lower()
     
+    # Определяем подтип клика: все категории за один проход
+    return _click_keyword_type(target) or _AT_CLICK_BUTTON
+
+def _detect_type(args: Dict, context: Dict) -> ActionType:
+    text = _arg_value(args, "text", "").lower()
+    
+    # Определяем тип вводимых данных
+    keyword_type = _type_keyword_type(text)
+    # Телефон и карта без цифр невозможны: regex не запускаем
+    has_digits = _has_digits(text)
+    if keyword_type is _AT_TYPE_PASSWORD:
+        return _AT_TYPE_PASSWORD
+    elif "@" in text and "." in text and len(text) > 5:
+        return _AT_TYPE_EMAIL
+    elif has_digits and _PHONE_DIGITS_RE.search(text):
+        return _AT_TYPE_PHONE
+    elif has_digits and _CARD_RE.search(text):
+        return _AT_TYPE_CARD
+    elif keyword_type is _AT_TYPE_PERSONAL:
+        return _AT_TYPE_PERSONAL
+    elif context.get("is_login_page", False) and context.get("contains_passwords", False):
+        return _AT_TYPE_PASSWORD
     else:
-        return ActionType.CLICK
+        return _AT_TYPE
 
-def is_external_domain(current_url: str, target_url: str) -> bool:
-    """Проверить, является ли домен внешним."""
+def _detect_navigate(args: Dict, context: Dict) -> ActionType:
+    url = _arg_value(args, "url", "")
+    if _HTTP_URL_RE.match(url):
+        return _AT_NAVIGATE_SUSPICIOUS
+    elif _SUSPICIOUS_URL_RE.search(url):
+        return _AT_NAVIGATE_SUSPICIOUS
+    else:
+        return _AT_NAVIGATE
+
+def _detect_scroll(args: Dict, context: Dict) -> ActionType:
+    return _AT_SCROLL
+
+def _detect_analyze(args: Dict, context: Dict) -> ActionType:
+    return _AT_ANALYZE
+
+def _detect_other(args: Dict, context: Dict) -> ActionType:
+    return _AT_CLICK
+
+# Инструмент -> определение типа действия (один поиск в словаре вместо цепочки сравнений)
+_ACTION_DETECTORS: Dict[str, Callable[[Dict, Dict], ActionType]] = {
+    "click_element": _detect_click,
+    "type_text": _detect_type,
+    "navigate": _detect_navigate,
+    "scroll_down": _detect_scroll,
+    "analyze_page": _detect_analyze,
+}
+
+def detect_action_type(tool_name: str, args: Dict, context: Optional[Dict] = None) -> ActionType:
+    """Определить тип действия по названию инструмента и аргументам."""
+    return _ACTION_DETECTORS.get(tool_name, _detect_other)(args, context or {})
+
+@lru_cache(maxsize=2048)
+def _netloc(url: str) -> str:
+    """Домен (netloc) из URL; разбор URL кэшируется, текущий URL повторяется постоянно."""
     try:
-        current_domain = urlparse(current_url).netloc
-        target_domain = urlparse(target_url).netloc
-        if not current_domain or not target_domain:
-            return False
-        return target_domain != current_domain
+        return urlparse(url).netloc
     except Exception:
+        return ""
+
+@lru_cache(maxsize=2048)
+def _site(netloc: str) -> str:
+    """Регистрируемый домен по Public Suffix List (example.co.uk для a.example.co.uk:8080)."""
+    parts = _TLD_EXTRACTOR(netloc)
+    return ".".join(filter(None, (parts.domain, parts.suffix)))
+
+def is_external_domain(current_url: str, target_url: str) -> bool:
+    """Проверить, является ли домен внешним."""
+    current_domain = _netloc(current_url)
+    target_domain = _netloc(target_url)
+    if not current_domain or not target_domain or target_domain == current_domain:
         return False
+    if TLDEXTRACT_AVAILABLE:
+        # Поддомены одного сайта (a.example.com и example.com) внешними не считаются
+        return _site(target_domain) != _site(current_domain)
+    return True
 
 def mask_sensitive_data(text: str) -> str:
     """Замаскировать чувствительные данные в тексте."""
     if not text:
         return text
     
-    # Проверяем, что text - это строка, а не корутина
-    if asyncio.iscoroutine(text):
-        return "[coroutine]"
+    # Обычно это строка; корутину не раскрываем, прочие значения приводим к строке
+    if not isinstance(text, str):
+        if asyncio.iscoroutine(text):
+            return "[coroutine]"
+        text = str(text)
     
+    # Один проход: в большинстве текстов маскировать нечего
+    if "@" not in text and not _MASK_RE.search(text):
+        return text
+    
+    # Замены идут по очереди: маска карты должна сработать раньше,
+    # чем цифры номера захватит маска пароля
     # Номера карт
-    text = re.sub(
-        r'\b\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}\b',
+    text = _CARD_RE.sub(
         lambda m: f'{m.group()[:4]} **** **** {m.group()[-4:]}',
         text
     )
     
     # CVV/CVC
-    text = re.sub(
-        r'\b(CVV|CVC)[:\s]*\d{3,4}\b',
-        r'\1: ***',
-        text,
-        flags=re.IGNORECASE
-    )
+    text = _CVV_RE.sub(r'\1: ***', text)
     
     # Пароли (в логах)
-    if "пароль" in text.lower() or "password" in text.lower():
-        text = re.sub(
-            r'(пароль|password)[:\s]*[^\s]+',
-            r'\1: *******',
-            text,
-            flags=re.IGNORECASE
-        )
+    text = _PASSWORD_RE.sub(r'\1: *******', text)
     
     # Email частично
-    text = re.sub(
-        r'\b([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+\.[A-Z|a-z]{2,})\b',
-        lambda m: f'{m.group(1)[:3]}***@{m.group(2)}',
-        text
-    )
+    if "@" in text:
+        text = _EMAIL_RE.sub(
+            lambda m: f'{m.group(1)[:3]}***@{m.group(2)}',
+            text
+        )
     
     # Телефоны
-    text = re.sub(
-        r'\b(\+7|8)[\s-]?\(?\d{3}\)?[\s-]?\d{3}[\s-]?\d{2}[\s-]?\d{2}\b',
+    text = _PHONE_RE.sub(
         lambda m: f'{m.group()[:4]} *** ** {m.group()[-2:]}',
         text
     )
     
     return text
 
-def generate_action_hash(action_type: ActionType, target: str, context: Dict[str, Any]) -> str:
-    """Генерация уникального хеша для действия."""
+def generate_action_hash(action_type: ActionType, target: str, context: Dict[str, Any]) -> int:
+    """Генерация уникального хеша для действия (128-битное целое)."""
     cache_key = f"{action_type.value}:{target}:{context.get('current_url', '')}"
     
+    if CACHETOOLS_AVAILABLE:
+        action_hash = _action_hash_cache.get(cache_key)
+        if action_hash is None:
+            action_hash = _action_hash_cache[cache_key] = _compute_action_hash(cache_key, context)
+        return action_hash
+    
     # Проверяем кэш
-    if cache_key in _action_hash_cache:
-        cached_data = _action_hash_cache[cache_key]
-        if datetime.now() - cached_data['timestamp'] < _cache_ttl:
-            return cached_data['hash']
+    cached = _action_hash_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[1] < _CACHE_TTL_S:
+        return cached[0]
     
-    # Генерируем новый хеш
-    data = f"{action_type.value}:{target}:{context.get('current_url', '')}:{hashlib.md5(json.dumps(context, sort_keys=True).encode()).hexdigest()[:8]}"
-    action_hash = hashlib.md5(data.encode()).hexdigest()[:16]
+    action_hash = _compute_action_hash(cache_key, context)
     
     # Сохраняем в кэш
-    _action_hash_cache[cache_key] = {
-        'hash': action_hash,
-        'timestamp': datetime.now()
-    }
+    _action_hash_cache[cache_key] = (action_hash, time.monotonic())
+    _action_hash_cache.move_to_end(cache_key)
     
     # Очищаем старые записи
-    _clean_hash_cache()
+    global _inserts_since_sweep
+    _inserts_since_sweep += 1
+    if _inserts_since_sweep >= _SWEEP_INTERVAL or len(_action_hash_cache) > _CACHE_MAX_SIZE:
+        _clean_hash_cache()
     
     return action_hash
 
+def _compute_action_hash(cache_key: str, context: Dict[str, Any]) -> int:
+    """Вычислить хеш действия по ключу кэша и контексту."""
+    # xxh3_128 (если установлен xxhash) или blake2b, оба быстрее md5/sha256;
+    # целый ключ дешевле строки в set
+    if XXHASH_AVAILABLE:
+        hasher = xxhash.xxh3_128()
+    else:
+        hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(cache_key.encode())
+    hasher.update(b"\0")
+    _update_hash(hasher, context)
+    return int.from_bytes(hasher.digest(), 'little')
+
+def _update_hash(hasher: Any, value: Any) -> None:
+    """Передать значение в хешер по частям, без промежуточной JSON-строки.
+    
+    Ключи словарей сортируются (как sort_keys в json.dumps), поэтому хеш
+    не зависит от порядка вставки; остальные значения передаются через repr.
+    """
+    if isinstance(value, dict):
+        hasher.update(b"{")
+        for key, item in sorted(value.items()):
+            hasher.update(repr(key).encode())
+            hasher.update(b"=")
+            _update_hash(hasher, item)
+            hasher.update(b"\x1e")
+        hasher.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        hasher.update(b"[")
+        for item in value:
+            _update_hash(hasher, item)
+            hasher.update(b"\x1e")
+        hasher.update(b"]")
+    else:
+        hasher.update(repr(value).encode())
+
 def _clean_hash_cache():
     """Очистить старые записи из кэша хешей."""
-    global _action_hash_cache
-    now = datetime.now()
-    to_remove = []
+    global _inserts_since_sweep
+    _inserts_since_sweep = 0
+    now = time.monotonic()
+    
+    # Устаревшие записи идут подряд с начала: обходить весь кэш не нужно
+    while _action_hash_cache:
+        _, timestamp = next(iter(_action_hash_cache.values()))
+        if now - timestamp <= _CACHE_TTL_S:
+            break
+        _action_hash_cache.popitem(last=False)
+    
+    # При переполнении удаляем самые старые записи
+    while len(_action_hash_cache) > _CACHE_MAX_SIZE:
+        _action_hash_cache.popitem(last=False)
+
+# Пороги оценки риска (0-100) и уровни между ними
+_LEVEL_THRESHOLDS = (30, 60, 80)
+_LEVELS = ("low", "medium", "high", "critical")
+
+def risk_level_for(score: float) -> str:
+    """Определить уровень риска по оценке 0-100."""
+    return _LEVELS[bisect_right(_LEVEL_THRESHOLDS, score)]
+
+# Буквы, которые re.IGNORECASE считает равными, а str.lower() не сводит к одной
+# форме (дополнительные регистры модуля re): заменяются на основную букву
+_CASE_VARIANTS = str.maketrans(
+    "\u0131\u017f\u00b5\u0345\u1fbe\u1fd3\u1fe3\u03d0\u03f5\u03d1\u03f0\u03d6\u03f1\u03c2\u03d5"
+    "\u1c80\u1c81\u1c82\u1c83\u1c84\u1c85\u1c86\u1c87\u1c88\u1e9b\ufb05",
+    "is\u03bc\u03b9\u03b9\u0390\u03b0\u03b2\u03b5\u03b8\u03ba\u03c0\u03c1\u03c3\u03c6"
+    "\u0432\u0434\u043e\u0441\u0442\u0442\u044a\u0463\ua64b\u1e61\ufb06",
+)
+# İ - единственная буква, у которой lower() дает два символа; re сравнивает ее как i
+_DOTTED_I = str.maketrans({"\u0130": "i"})
+
+def fold_case(text: str) -> str:
+    """Привести текст к нижнему регистру так, как его сравнивает re.IGNORECASE.
     
-    for key, data in _action_hash_cache.items():
-        if now - data['timestamp'] > _cache_ttl:
-            to_remove.append(key)
+    Длина текста не меняется; строчный паттерн без IGNORECASE находит в
+    результате то же, что паттерн с IGNORECASE в исходном тексте.
+    """
+    return text.translate(_DOTTED_I).lower().translate(_CASE_VARIANTS)
+
+def count_patterns(patterns: Dict[str, Dict[str, List[str]]]) -> int:
+    """Посчитать все совпадения во вложенном словаре паттернов."""
+    return sum(map(len, chain.from_iterable(category.values() for category in patterns.values())))
+
+# Весовые коэффициенты контрольных цифр ИНН
+_INN_WEIGHTS_10 = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN_WEIGHTS_11 = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+_INN_WEIGHTS_12 = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+
+def _inn_check_digit(digits: List[int], weights: Tuple[int, ...]) -> int:
+    return sum(d * w for d, w in zip(digits, weights)) % 11 % 10
+
+def is_luhn_valid(number: str) -> bool:
+    """Проверить номер карты по алгоритму Луна (разделители игнорируются)."""
+    digits = [int(c) for c in number if c.isdecimal()]
+    if not digits:
+        return False
     
-    for key in to_remove:
-        del _action_hash_cache[key]
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return total % 10 == 0
+
+def is_inn_valid(inn: str) -> bool:
+    """Проверить контрольные цифры ИНН (10 или 12 цифр)."""
+    digits = [int(c) for c in inn if c.isdecimal()]
+    if len(digits) == 10:
+        return _inn_check_digit(digits, _INN_WEIGHTS_10) == digits[9]
+    if len(digits) == 12:
+        return (_inn_check_digit(digits, _INN_WEIGHTS_11) == digits[10] and
+                _inn_check_digit(digits, _INN_WEIGHTS_12) == digits[11])
+    return False
 
 def extract_domain(url: str) -> str:
     """Извлечь домен из URL."""
-    try:
-        parsed = urlparse(url)
-        return parsed.netloc
-    except Exception:
-        return ""
+    return _netloc(url)
 
 def is_suspicious_domain(domain: str) -> bool:
     """Проверить, является ли домен подозрительным."""
-    suspicious_tlds = ['.tk', '.ml', '.ga', '.cf', '.gq', '.xyz', '.top', '.club']
-    suspicious_keywords = ['phishing', 'malware', 'scam', 'hack', 'exploit']
-    
     domain_lower = domain.lower()
     
-    # Проверяем TLD
-    for tld in suspicious_tlds:
-        if domain_lower.endswith(tld):
-            return True
-    
-    # Проверяем ключевые слова
-    for keyword in suspicious_keywords:
-        if keyword in domain_lower:
-            return True
+    # Проверяем TLD: поиск последней метки во множестве
+    _, dot, tld = domain_lower.rpartition('.')
+    if dot and tld in _SUSPICIOUS_TLDS:
+        return True
     
-    return False
+    # Проверяем ключевые слова одним проходом
+    return bool(_SUSPICIOUS_KEYWORDS_RE.search(domain_lower))
 
 def normalize_text(text: str) -> str:
     """Нормализовать текст для сравнения."""
     if not text:
         return ""
     
-    # Проверяем, не корутина ли
-    if asyncio.iscoroutine(text):
-        return ""
+    # Обычно это строка; корутина дает пустой текст, прочие значения - строку
+    if not isinstance(text, str):
+        if asyncio.iscoroutine(text):
+            return ""
+        text = str(text)
     
     # Приводим к нижнему регистру
     text = text.lower()
@@ -229,33 +514,52 @@ def normalize_text(text: str) -> str:
     text = ' '.join(text.split())
     
     # Удаляем специальные символы (оставляем только буквы, цифры и пробелы)
-    text = re.sub(r'[^a-zа-яё0-9\s]', ' ', text)
+    text = _strip_special(text)
     
     return text.strip()
 
+def _word_set(text: str) -> Set[str]:
+    """Множество слов нормализованного текста (как normalize_text(text).split())."""
+    if not isinstance(text, str):
+        text = normalize_text(text)
+    # Пробелы схлопывает split(), поэтому промежуточная строка normalize_text не нужна
+    return set(_strip_special(text.lower()).split())
+
 def calculate_text_similarity(text1: str, text2: str) -> float:
-    """Вычислить схожесть двух текстов."""
+    """Вычислить схожесть двух текстов (коэффициент Жаккара по словам)."""
     if not text1 or not text2:
         return 0.0
     
-    # Нормализуем тексты
-    norm1 = normalize_text(text1)
-    norm2 = normalize_text(text2)
-    
-    if not norm1 or not norm2:
-        return 0.0
-    
-    # Простой алгоритм схожести (можно заменить на более сложный)
-    words1 = set(norm1.split())
-    words2 = set(norm2.split())
+    words1 = _word_set(text1)
+    words2 = _word_set(text2)
     
     if not words1 or not words2:
         return 0.0
     
-    intersection = words1.intersection(words2)
-    union = words1.union(words2)
+    # Размер объединения считается из размеров, без построения самого множества
+    common = len(words1 & words2)
+    return common / (len(words1) + len(words2) - common)
+
+def safe_executor(func: Callable) -> Callable[..., Awaitable[Tuple[bool, Any]]]:
+    """Обернуть функцию для безопасного выполнения с обработкой исключений.
+    
+    Корутинная ли функция, определяется один раз при обертывании, а не на
+    каждом вызове; для многократных вызовов одной функции.
+    """
+    if asyncio.iscoroutinefunction(func):
+        async def execute(*args, **kwargs) -> Tuple[bool, Any]:
+            try:
+                return True, await func(*args, **kwargs)
+            except Exception as e:
+                return False, str(e)
+    else:
+        async def execute(*args, **kwargs) -> Tuple[bool, Any]:
+            try:
+                return True, func(*args, **kwargs)
+            except Exception as e:
+                return False, str(e)
     
-    return len(intersection) / len(union) if union else 0.0
+    return execute
 
 async def safe_execute(func: Callable, *args, **kwargs) -> Tuple[bool, Any]:
     """Безопасно выполнить функцию с обработкой исключений."""